@@ -6,14 +6,15 @@ from sklearn.linear_model import LogisticRegression, LinearRegression
 from sklearn.model_selection import cross_val_score, train_test_split, TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler
 import joblib
-from indicators.ta import compute_all_indicators
+from indicators.cache import cached_features
 
 class AIPredictor:
     """
     Classe para previsão de direção (e preço) via Machine Learning.
     Suporta regressão para previsão de preço e classificação multi-classe.
     """
-    def __init__(self, model_type='logistic', n_ahead=1, multiclass=False, feature_set=None, cv_strategy='kfold'):
+    def __init__(self, model_type='logistic', n_ahead=1, multiclass=False, feature_set=None, cv_strategy='kfold',
+                 multi_timeframe=False):
         self.model_type = model_type
         self.n_ahead = n_ahead
         self.multiclass = multiclass
@@ -28,12 +29,16 @@ class AIPredictor:
         # estratégia de validação cruzada (kfold ou time_series). Para dados temporais é
         # recomendável usar TimeSeriesSplit para evitar leakage.
         self.cv_strategy = cv_strategy
+        # junta às features diárias as semanais/mensais (w_*, m_*), sem lookahead
+        self.multi_timeframe = multi_timeframe
 
     def build_features(self, data):
         """Calcula e devolve DataFrame de features técnicas a partir de um DataFrame de OHLCV."""
-        features = compute_all_indicators(data)
-        df = pd.DataFrame(features).dropna()
-        return df
+        # Os mesmos dados são usados várias vezes (treino, probabilidade, preço, features)
+        # Um modelo carregado com features w_*/m_* precisa delas mesmo sem multi_timeframe
+        multi_timeframe = self.multi_timeframe or any(
+            str(name).startswith(("w_", "m_")) for name in (self.features or []))
+        return cached_features(data, multi_timeframe=multi_timeframe)
 
     def _make_targets(self, close):
         n = self.n_ahead
@@ -1,15 +1,13 @@
 
-import pandas as pd
 from sklearn.linear_model import LogisticRegression
-from indicators.ta import compute_all_indicators
+from indicators.cache import cached_features
 
-def prepare_features(data):
+def prepare_features(data, multi_timeframe=False):
     """
     Prepara features completas a partir de um DataFrame de preços (OHLCV).
-    Retorna DataFrame só com features técnicas.
+    Retorna DataFrame só com features técnicas (com multi_timeframe=True, também as semanais/mensais).
     """
-    df = pd.DataFrame(compute_all_indicators(data)).dropna()
-    return df
+    return cached_features(data, multi_timeframe=multi_timeframe)
 
 def train_direction_model(data):
     """
@@ -1,5 +1,184 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
 import pandas as pd
 
+from backtest.metrics import calculate_batch_metrics
+
+
+def _format_dates(index):
+    """Datas das trades como texto 'AAAA-MM-DD' (ou str() se o índice não for de datas)."""
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return list(np.datetime_as_string(index.to_numpy(), unit="D"))
+    return [str(date.date()) if hasattr(date, "date") else str(date) for date in index]
+
+
+def simulate_long_only(close, signals, initial_capital, stop_loss=None, take_profit=None):
+    """
+    Núcleo do backtest sobre arrays numpy (long-only, all-in/all-out).
+    close: preços de fecho (float); signals: 1=compra, -1=venda, 0=nada, alinhados com close.
+    stop_loss/take_profit (opcionais, ex.: -0.02 e 0.03): a posição fecha também na primeira
+    barra, a partir da compra, em que o retorno face ao preço de entrada atinge um dos limites.
+    O capital só muda nas trades, por isso o ciclo em Python é sobre as trades (poucas)
+    e não sobre as barras; saldo e posição por barra são depois expandidos em blocos.
+    Retorna (equity por barra, lista de trades (índice, tipo, quantidade, preço, resultado)).
+    """
+    n = len(close)
+    prices = close.tolist()
+    buy_rows = np.flatnonzero(signals == 1)
+    buys = buy_rows.tolist()
+    sells = np.flatnonzero(signals == -1).tolist()
+    # Blocos [bounds[i], bounds[i + 1]) com saldo e posição constantes
+    bounds, cash_blocks, position_blocks = [0], [], []
+    trades = []
+    cash = initial_capital
+    start = 0
+    while True:
+        # Compra: primeiro sinal de compra com capital suficiente desde a última venda
+        k = bisect_left(buys, start)
+        if k == len(buys):
+            break
+        if not prices[buys[k]] <= cash:
+            affordable = np.flatnonzero(close[buy_rows[k:]] <= cash)
+            if not affordable.size:
+                break
+            k += int(affordable[0])
+        entry = buys[k]
+        entry_price = prices[entry]
+        qty = int(cash // entry_price)
+        bounds.append(entry)
+        cash_blocks.append(cash)
+        position_blocks.append(0)
+        cash -= qty * entry_price
+        trades.append((entry, "Compra", qty, entry_price, None))
+        # Venda: primeiro sinal de venda depois da compra (até lá a posição mantém-se)
+        j = bisect_right(sells, entry)
+        exit_ = sells[j] if j < len(sells) else n
+        if stop_loss is not None or take_profit is not None:
+            # ... ou antes, se o retorno desde a entrada atingir o stop-loss/take-profit
+            ret = (close[entry:exit_] - entry_price) / entry_price
+            hit = np.zeros(len(ret), dtype=bool)
+            if stop_loss is not None:
+                hit |= ret <= stop_loss
+            if take_profit is not None:
+                hit |= ret >= take_profit
+            first = np.flatnonzero(hit)
+            if first.size:
+                exit_ = entry + int(first[0])
+        bounds.append(exit_)
+        cash_blocks.append(cash)
+        position_blocks.append(qty)
+        if exit_ == n:
+            break
+        exit_price = prices[exit_]
+        cash += qty * exit_price
+        trades.append((exit_, "Venda", qty, exit_price, (exit_price - entry_price) * qty))
+        # Nova compra só a partir da barra seguinte à venda
+        start = exit_ + 1
+    bounds.append(n)
+    cash_blocks.append(cash)
+    position_blocks.append(0)
+    lengths = np.diff(bounds)
+    cash_by_bar = np.repeat(np.array(cash_blocks, dtype=float), lengths)
+    position_by_bar = np.repeat(np.array(position_blocks, dtype=float), lengths)
+    # Saldo = cash + valor da posição aberta (se existir)
+    return cash_by_bar + position_by_bar * close, trades
+
+
+def trades_frame(index, trades):
+    """DataFrame de trades (Data, Tipo, Quantidade, Preço, Resultado (€)) a partir da lista de simulate_long_only."""
+    if not trades:
+        return pd.DataFrame()
+    rows, kinds, qtys, prices, results = zip(*trades)
+    # Resultado (€) fica "" nas compras, como no registo original
+    resultado = np.full(len(trades), "", dtype=object)
+    sold = np.array([r is not None for r in results])
+    resultado[sold] = list(np.round(np.array([r for r in results if r is not None], dtype=float), 2))
+    return pd.DataFrame({
+        "Data": _format_dates(index.take(rows)),
+        "Tipo": list(kinds),
+        "Quantidade": list(qtys),
+        "Preço": np.round(np.array(prices, dtype=float), 2),
+        "Resultado (€)": resultado
+    })
+
+
+def _next_index(mask):
+    """(n+1)×N: para cada barra t e coluna, a primeira barra >= t com mask verdadeiro (n se não houver)."""
+    n = mask.shape[0]
+    rows = np.where(mask, np.arange(n)[:, None], n)
+    rows = np.vstack([rows, np.full((1, mask.shape[1]), n)])
+    return np.minimum.accumulate(rows[::-1], axis=0)[::-1]
+
+
+def _fill_forward(values, is_set):
+    """Propaga para baixo (eixo 0) o último valor marcado em is_set (a primeira linha tem de estar marcada)."""
+    rows = np.where(is_set, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return np.take_along_axis(values, rows, axis=0)
+
+
+def simulate_long_only_batch(close, signals, initial_capital):
+    """
+    Versão de simulate_long_only para N vectores de sinais sobre o mesmo preço.
+    close: array (n,); signals: array (n, N). Todas as colunas avançam em conjunto,
+    uma ida-e-volta (compra + venda) por iteração, com operações vectorizadas sobre as colunas.
+    Retorna (equity (n, N), nº de vendas por coluna, nº de vendas com lucro por coluna);
+    cada coluna da equity é igual à de simulate_long_only com os mesmos sinais.
+    """
+    n, m = signals.shape
+    next_buy = _next_index(signals == 1)
+    next_sell = _next_index(signals == -1)
+    # Saldo e posição só mudam nas trades: guardam-se nessas barras e propagam-se no fim
+    cash_levels = np.empty((n, m))
+    positions = np.zeros((n, m))
+    changed = np.zeros((n, m), dtype=bool)
+    if n:
+        cash_levels[0] = initial_capital
+        changed[0] = True
+    cash = np.full(m, float(initial_capital))
+    start = np.zeros(m, dtype=np.intp)
+    sells = np.zeros(m, dtype=int)
+    wins = np.zeros(m, dtype=int)
+    active = np.arange(m)
+    while active.size:
+        # Compra: primeiro sinal de compra com capital suficiente desde a última venda
+        entry = next_buy[start[active], active]
+        while True:
+            pending = entry < n
+            poor = pending.copy()
+            poor[pending] = ~(close[entry[pending]] <= cash[active[pending]])
+            if not poor.any():
+                break
+            entry[poor] = next_buy[entry[poor] + 1, active[poor]]
+        keep = entry < n
+        active, entry = active[keep], entry[keep]
+        if not active.size:
+            break
+        entry_price = close[entry]
+        qty = np.floor_divide(cash[active], entry_price)
+        cash[active] -= qty * entry_price
+        cash_levels[entry, active] = cash[active]
+        positions[entry, active] = qty
+        changed[entry, active] = True
+        # Venda: primeiro sinal de venda depois da compra
+        exit_ = next_sell[entry + 1, active]
+        keep = exit_ < n
+        active, exit_, qty, entry_price = active[keep], exit_[keep], qty[keep], entry_price[keep]
+        exit_price = close[exit_]
+        cash[active] += qty * exit_price
+        cash_levels[exit_, active] = cash[active]
+        positions[exit_, active] = 0
+        changed[exit_, active] = True
+        sells[active] += 1
+        wins[active] += np.round((exit_price - entry_price) * qty, 2) > 0
+        start[active] = exit_
+    equity = _fill_forward(cash_levels, changed) + _fill_forward(positions, changed) * close[:, None]
+    return equity, sells, wins
+
+
 class Backtester:
     """
     Classe para backtesting de estratégias de trading.
@@ -21,49 +200,34 @@ class Backtester:
         if not signals.index.equals(data.index):
             signals = signals.reindex(data.index, fill_value=0)
 
-        cash = self.initial_capital
-        position = 0
-        equity_curve = []
-        trades = []
-        entry_price = None
-
-        for date, signal in signals.items():
-            price = data['Close'].loc[date]
-
-            # Compra: só se não estamos comprados
-            if signal == 1 and position == 0:
-                qty = int(cash // price)
-                if qty > 0:
-                    position = qty
-                    cash -= qty * price
-                    entry_price = price
-                    trades.append({
-                        "Data": str(date.date()) if hasattr(date, "date") else str(date),
-                        "Tipo": "Compra",
-                        "Quantidade": qty,
-                        "Preço": round(price, 2),
-                        "Resultado (€)": ""
-                    })
-            # Venda: só se estamos comprados
-            elif signal == -1 and position > 0:
-                resultado = (price - entry_price) * position
-                cash += position * price
-                trades.append({
-                    "Data": str(date.date()) if hasattr(date, "date") else str(date),
-                    "Tipo": "Venda",
-                    "Quantidade": position,
-                    "Preço": round(price, 2),
-                    "Resultado (€)": round(resultado, 2)
-                })
-                position = 0
-                entry_price = None
-
-            # Atualiza equity curve: saldo = cash + valor da posição aberta (se existir)
-            equity_curve.append(cash + position * price)
-
-        equity_curve = pd.Series(equity_curve, index=data.index)
-        trades_df = pd.DataFrame(trades)
+        close = data['Close'].to_numpy(dtype=float)
+        equity, trades = simulate_long_only(close, signals.to_numpy(), self.initial_capital)
+
+        return {
+            "equity_curve": pd.Series(equity, index=data.index),
+            "trades": trades_frame(data.index, trades)
+        }
+
+    def run_batch(self, data, signals):
+        """
+        Executa de uma só vez o backtest de N vectores de sinais sobre os mesmos preços.
+        Parâmetros:
+            data: DataFrame com preços históricos (tem de conter 'Close')
+            signals: pd.DataFrame datas × N (uma coluna por combinação de parâmetros)
+        Retorna:
+            - equity: pd.DataFrame datas × N (curva de capital de cada coluna)
+            - metrics: pd.DataFrame N × métricas (ver calculate_batch_metrics)
+        """
+        if not signals.index.equals(data.index):
+            signals = signals.reindex(data.index, fill_value=0)
+
+        close = data['Close'].to_numpy(dtype=float)
+        signal_values = signals.to_numpy()
+        equity, sells, wins = simulate_long_only_batch(close, signal_values, self.initial_capital)
+
+        equity = pd.DataFrame(equity, index=data.index, columns=signals.columns)
+        metrics = calculate_batch_metrics(signal_values, equity, sells, wins)
         return {
-            "equity_curve": equity_curve,
-            "trades": trades_df
+            "equity": equity,
+            "metrics": metrics
         }
@@ -1,3 +1,4 @@
+import warnings
 import numpy as np
 import pandas as pd
 
@@ -49,3 +50,44 @@ def calculate_metrics(data, signals, equity_curve, trades_df=None):
         "num_trades": num_trades,
         "win_rate": f"{win_rate:.1%}" if not pd.isna(win_rate) else "N/A",
     }
+
+
+def calculate_batch_metrics(signals, equity, num_sells=None, num_wins=None):
+    """
+    Métricas de calculate_metrics para N curvas de capital de uma só vez, em valores numéricos
+    (fracções, não texto), para ordenar/comparar combinações de parâmetros.
+    signals: array/DataFrame datas × N com sinais (1, 0, -1)
+    equity: DataFrame datas × N com a evolução do capital
+    num_sells, num_wins: nº de vendas e de vendas com lucro por coluna (opcional, para win rate)
+    Retorna DataFrame N × [retorno, drawdown, sharpe, num_trades, win_rate].
+    """
+    values = equity.to_numpy(dtype=float)
+    signal_values = np.asarray(signals)
+    n, m = values.shape
+    metrics = pd.DataFrame(index=equity.columns,
+                           columns=["retorno", "drawdown", "sharpe", "num_trades", "win_rate"], dtype=float)
+    metrics["num_trades"] = ((signal_values == 1).sum(axis=0) + (signal_values == -1).sum(axis=0)).astype(int)
+    if n < 2:
+        metrics["num_trades"] = 0
+        return metrics
+
+    # Retorno total
+    metrics["retorno"] = values[-1] / values[0] - 1
+
+    # Drawdown máximo
+    metrics["drawdown"] = (values / np.maximum.accumulate(values, axis=0) - 1).min(axis=0)
+
+    # Sharpe ratio anualizado
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # Colunas com menos de 2 retornos válidos dão sharpe NaN, sem o aviso "Degrees of freedom <= 0"
+        warnings.simplefilter("ignore", RuntimeWarning)
+        daily_ret = values[1:] / values[:-1] - 1
+        mean = np.nanmean(daily_ret, axis=0)
+        std = np.nanstd(daily_ret, axis=0, ddof=1)
+        metrics["sharpe"] = np.where(std != 0, mean / std * np.sqrt(252), 0.0)
+
+    # Win rate: percentagem de vendas com lucro
+    if num_sells is not None and num_wins is not None:
+        num_sells = np.asarray(num_sells)
+        metrics["win_rate"] = np.where(num_sells > 0, np.asarray(num_wins) / np.maximum(num_sells, 1), np.nan)
+    return metrics
@@ -0,0 +1,227 @@
+"""
+Serviço de optimização de parâmetros em paralelo (ProcessPoolExecutor).
+
+Os pontos da grelha são divididos em lotes e cada lote corre num processo à parte,
+usando todos os núcleos. Os dados (e, nas grelhas de stop-loss/take-profit, os sinais)
+são enviados uma vez para cada processo, no arranque, e não em cada lote.
+
+- Grelha de parâmetros de uma estratégia (qualquer subclasse de BaseStrategy): em cada
+  lote os sinais saem de strategy_cls.grid_signals e os backtests de Backtester.run_batch.
+- Grelha de stop-loss/take-profit: simulate_with_sl_tp para cada par, com sinais fixos.
+
+Os resultados chegam à medida que os lotes terminam (iter_strategy_grid/iter_sl_tp_grid
+devolvem listas de (ponto, métricas)), para que um mapa de calor possa ser desenhado
+progressivamente; optimize_strategy/optimize_sl_tp juntam tudo num DataFrame.
+As métricas são as de calculate_batch_metrics (valores numéricos).
+
+Os resultados ficam na cache de backtests (backtest/result_cache.py): os pontos já
+calculados chegam logo no primeiro lote e só os restantes são enviados para os processos.
+"""
+
+import os
+import math
+import itertools
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from backtest.backtester import Backtester
+from backtest.metrics import calculate_batch_metrics
+from backtest.sl_tp import simulate_with_sl_tp
+from backtest.result_cache import backtest_cache
+from indicators.cache import data_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Lotes por processo: mais lotes dão resultados parciais mais frequentes, menos lotes menos overhead
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_SIZE = 64
+# Grelhas com menos pontos correm no próprio processo (arrancar a pool custa mais do que os backtests)
+MIN_PARALLEL_POINTS = 64
+# Os processos são criados com "spawn": a aplicação Qt tem várias threads e fazer fork dela não é seguro
+START_METHOD = "spawn"
+
+# Dados de cada processo de trabalho da pool (preenchidos por _init_worker): (data,) ou (data, signals)
+_worker_inputs = ()
+
+
+def param_grid(grid, constraint=None):
+    """
+    Lista de pontos (dicts) do produto cartesiano de {parâmetro: valores}.
+    constraint: função opcional ponto -> bool que exclui pontos inválidos (ex.: short >= long).
+    """
+    names = list(grid)
+    points = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    return [point for point in points if constraint is None or constraint(point)]
+
+
+def _init_worker(*inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _worker_chunk(func, points, *args):
+    """Corre func sobre um lote num processo de trabalho, com os dados recebidos em _init_worker."""
+    return func(points, *args, *_worker_inputs)
+
+
+def _strategy_chunk(points, strategy_cls, initial_capital, data):
+    """Backtest de um lote de pontos da grelha de uma estratégia."""
+    try:
+        signals = strategy_cls.grid_signals(data, points)
+        metrics = Backtester(initial_capital).run_batch(data, signals)["metrics"]
+        return list(zip(points, metrics.to_dict("records")))
+    except Exception as e:
+        logger.warning(f"Lote de optimização falhou ({strategy_cls.__name__}): {e}")
+        return [(point, None) for point in points]
+
+
+def _sl_tp_chunk(points, initial_capital, data, signals):
+    """Backtests com stop-loss/take-profit de um lote de pares."""
+    curves, sells, wins, done = {}, [], [], []
+    results = []
+    for point in points:
+        try:
+            equity_curve, trades = simulate_with_sl_tp(data, signals, point["stop_loss"], point["take_profit"],
+                                                       initial_capital)
+        except Exception as e:
+            logger.warning(f"Simulação stop/take falhou para {point}: {e}")
+            results.append((point, None))
+            continue
+        sold = trades[trades["Tipo"] == "Venda"] if not trades.empty else trades
+        curves[len(done)] = equity_curve
+        sells.append(len(sold))
+        wins.append(int((sold["Resultado (€)"] > 0).sum()) if len(sold) else 0)
+        done.append(point)
+    if done:
+        signal_values = signals.reindex(data.index, fill_value=0).to_numpy()
+        signal_matrix = np.broadcast_to(signal_values[:, None], (len(signal_values), len(done)))
+        metrics = calculate_batch_metrics(signal_matrix, pd.DataFrame(curves), sells, wins)
+        results.extend(zip(done, metrics.to_dict("records")))
+    return results
+
+
+class OptimizationService:
+    """
+    Corre grelhas de backtests em paralelo e devolve os resultados por lotes.
+    Uso:
+        service = OptimizationService()
+        for partial in service.iter_strategy_grid(data, SMACrossoverStrategy, points):
+            ...  # partial = [(ponto, métricas ou None), ...]
+    cancel() (por exemplo a partir de outra thread) interrompe a grelha em curso.
+    cache: BacktestCache onde se procuram e guardam os resultados (None desliga a cache).
+    """
+    def __init__(self, max_workers=None, chunk_size=None, cache=backtest_cache):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _chunks(self, points):
+        size = self.chunk_size or min(MAX_CHUNK_SIZE,
+                                      max(1, math.ceil(len(points) / (self.max_workers * CHUNKS_PER_WORKER))))
+        return [points[i:i + size] for i in range(0, len(points), size)]
+
+    def _iterate(self, func, points, args, inputs, key_func=None):
+        # O cancelamento anterior é esquecido já aqui, e não no primeiro next() do gerador:
+        # um cancel() feito antes de a thread que consome os resultados arrancar mantém-se
+        self._cancelled.clear()
+        return self._results(func, points, args, inputs, key_func)
+
+    def _results(self, func, points, args, inputs, key_func):
+        points = list(points)
+        if self.cache is not None and key_func is not None:
+            # Pontos já calculados saem da cache; só os restantes são corridos
+            cached, missing = [], []
+            for point in points:
+                metrics = self.cache.get(key_func(point))
+                if metrics is None:
+                    missing.append(point)
+                else:
+                    cached.append((point, metrics))
+            if cached:
+                yield cached
+            points = missing
+        for part in self._compute(func, points, args, inputs):
+            if self.cache is not None and key_func is not None:
+                for point, metrics in part:
+                    self.cache.put(key_func(point), metrics)
+            yield part
+
+    def _compute(self, func, points, args, inputs):
+        """
+        Resultados de func(lote, *args, *inputs) para cada lote de pontos. inputs (dados e,
+        se for o caso, sinais) passam directamente a func no próprio processo; na pool
+        são enviados uma vez a cada processo (_init_worker) e não com cada lote.
+        """
+        chunks = self._chunks(points)
+        if not chunks or self._cancelled.is_set():
+            return
+        # Grelha pequena ou um só núcleo: não compensa arrancar processos
+        if self.max_workers == 1 or len(chunks) == 1 or len(points) < MIN_PARALLEL_POINTS:
+            for chunk in chunks:
+                if self._cancelled.is_set():
+                    return
+                yield func(chunk, *args, *inputs)
+            return
+        executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(chunks)),
+                                       mp_context=multiprocessing.get_context(START_METHOD),
+                                       initializer=_init_worker, initargs=inputs)
+        try:
+            futures = [executor.submit(_worker_chunk, func, chunk, *args) for chunk in chunks]
+            for future in as_completed(futures):
+                if self._cancelled.is_set():
+                    return
+                yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_strategy_grid(self, data, strategy_cls, points, initial_capital=10000):
+        """Resultados (lista de (ponto, métricas)) de cada lote da grelha de parâmetros de strategy_cls."""
+        key_func = None
+        if self.cache is not None:
+            data_key = self.cache.data_key(data)
+
+            def key_func(point):
+                return self.cache.make_key(data_key, strategy_cls, point, initial_capital=initial_capital)
+        return self._iterate(_strategy_chunk, points, (strategy_cls, initial_capital), (data,), key_func)
+
+    def iter_sl_tp_grid(self, data, signals, points, initial_capital=10000, strategy=None):
+        """
+        Resultados de cada lote de pares {'stop_loss', 'take_profit'} para sinais fixos.
+        strategy: instância que gerou os sinais (identifica-os na cache); sem ela usa-se
+        a impressão digital dos próprios sinais.
+        """
+        key_func = None
+        if self.cache is not None:
+            data_key = self.cache.data_key(data)
+            if strategy is not None:
+                strategy_cls, params = type(strategy), strategy.get_params()
+            else:
+                strategy_cls, params = None, {"signals": data_fingerprint(signals, self.cache.tail_bars)}
+
+            def key_func(point):
+                return self.cache.make_key(data_key, strategy_cls, params, point["stop_loss"],
+                                           point["take_profit"], initial_capital)
+        return self._iterate(_sl_tp_chunk, points, (initial_capital,), (data, signals), key_func)
+
+    def optimize_strategy(self, data, strategy_cls, points, initial_capital=10000):
+        """DataFrame com uma linha por ponto (parâmetros + métricas) da grelha de strategy_cls."""
+        return _results_frame(itertools.chain.from_iterable(
+            self.iter_strategy_grid(data, strategy_cls, points, initial_capital)))
+
+    def optimize_sl_tp(self, data, signals, points, initial_capital=10000, strategy=None):
+        """DataFrame com uma linha por par stop-loss/take-profit e as respectivas métricas."""
+        return _results_frame(itertools.chain.from_iterable(
+            self.iter_sl_tp_grid(data, signals, points, initial_capital, strategy)))
+
+
+def _results_frame(results):
+    return pd.DataFrame([{**point, **(metrics or {})} for point, metrics in results])
@@ -0,0 +1,89 @@
+"""
+Cache (memoização) de resultados de backtests.
+
+Cada entrada guarda as métricas de um backtest (ver calculate_batch_metrics) com a chave
+(ticker, intervalo, impressão digital dos dados, estratégia, parâmetros, stop-loss,
+take-profit, capital inicial). A impressão digital é a da cache de indicadores
+(indicators/cache.py): dados iguais reutilizam os resultados, e uma barra nova ou revista
+dá uma chave nova.
+
+O OptimizationService consulta esta cache antes de correr uma grelha e só calcula os
+pontos em falta; pedir de novo a mesma grelha (ex.: o MainWindow a procurar o melhor
+par depois de fechar o diálogo do mapa de calor) é apenas uma consulta.
+"""
+
+import threading
+
+from data.memory_cache import FrameLRUCache
+from indicators.cache import data_fingerprint, DEFAULT_TAIL_BARS
+
+DEFAULT_BACKTEST_CACHE_BYTES = 32 * 1024 ** 2
+
+
+def _plain(value):
+    """Escalares numpy -> Python, para que 5 e np.int64(5) dêem a mesma chave."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def strategy_id(strategy_cls):
+    return f"{strategy_cls.__module__}.{strategy_cls.__qualname__}" if strategy_cls is not None else None
+
+
+class BacktestCache:
+    """
+    Métricas de backtests já corridos, limitadas em bytes (FrameLRUCache).
+    Uso:
+        data_key = cache.data_key(data)
+        key = cache.make_key(data_key, SMACrossoverStrategy, {"short_window": 20, "long_window": 100})
+        metrics = cache.get(key)  # None se ainda não foi calculado
+    """
+    def __init__(self, max_bytes=DEFAULT_BACKTEST_CACHE_BYTES, tail_bars=DEFAULT_TAIL_BARS):
+        self.memory = FrameLRUCache(max_bytes, label="Cache de backtests")
+        self.tail_bars = tail_bars
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def data_key(self, data):
+        """Parte da chave que identifica os dados (calcula-se uma vez por grelha)."""
+        attrs = getattr(data, "attrs", {}) or {}
+        return attrs.get("ticker"), attrs.get("interval"), data_fingerprint(data, self.tail_bars)
+
+    def make_key(self, data_key, strategy_cls, params, stop_loss=None, take_profit=None, initial_capital=10000):
+        params = tuple(sorted((name, _plain(value)) for name, value in params.items()))
+        return (data_key, strategy_id(strategy_cls), repr(params),
+                _plain(stop_loss), _plain(take_profit), _plain(initial_capital))
+
+    def get(self, key):
+        """Cópia das métricas guardadas para a chave, ou None."""
+        metrics = self.memory.get(key)
+        with self._lock:
+            if metrics is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return dict(metrics) if metrics is not None else None
+
+    def put(self, key, metrics):
+        if metrics is not None:
+            self.memory[key] = dict(metrics)
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+        stats.update(self.memory.stats())
+        return stats
+
+
+# Cache partilhada pelo serviço de optimização, pelos diálogos e pelo MainWindow
+backtest_cache = BacktestCache()
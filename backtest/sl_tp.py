@@ -0,0 +1,27 @@
+import pandas as pd
+
+from backtest.backtester import simulate_long_only, trades_frame
+
+
+def simulate_with_sl_tp(data: pd.DataFrame, signals: pd.Series, stop_loss: float, take_profit: float, initial_capital: float = 10000):
+    """
+    Simula uma estratégia com stop-loss e take-profit percentuais
+    relativamente ao preço de entrada.
+
+    Parâmetros:
+        data: DataFrame com coluna 'Close'
+        signals: Série com sinais (1=compra, -1=venda, 0=nada)
+        stop_loss: percentagem negativa, ex: -0.02 para -2%
+        take_profit: percentagem positiva, ex: 0.03 para +3%
+        initial_capital: capital inicial
+
+    Retorna:
+        equity_curve: série de capital ao longo do tempo
+        trades: DataFrame de trades registadas
+    """
+    # Assegura alinhamento de índice
+    if not signals.index.equals(data.index):
+        signals = signals.reindex(data.index, fill_value=0)
+    close = data['Close'].to_numpy(dtype=float)
+    equity, trades = simulate_long_only(close, signals.to_numpy(), initial_capital, stop_loss, take_profit)
+    return pd.Series(equity, index=data.index), trades_frame(data.index, trades)
@@ -1,60 +1,434 @@
+import threading
+from concurrent.futures import Future
 import pandas as pd
-import yfinance as yf
 import logging
+from data.ohlcv_store import OHLCVStore, OHLCV_STORE_DIR, merge_bars, history_revised
+from data.quote_cache import QuoteCache
+from data.memory_cache import FrameLRUCache, DEFAULT_CACHE_MAX_BYTES
+from data.fetch_engine import FetchEngine
+from data.negative_cache import NegativeCache, NEGATIVE_CACHE_FILE, is_missing_symbol_error
+from data.sources import YFinanceSource, INTRADAY_DELTAS, period_start
+from data.dtypes import compact_ohlcv
+from indicators.cache import indicator_cache
 
 logger = logging.getLogger(__name__)
 
+LONG_INTERVAL_DELTAS = {
+    '5d': pd.Timedelta(days=5), '1wk': pd.Timedelta(days=7),
+    '1mo': pd.Timedelta(days=31), '3mo': pd.Timedelta(days=92),
+}
+# Tolerância para fins de semana/feriados no início da janela pedida
+COVERAGE_TOLERANCE = pd.Timedelta(days=7)
+# Número de tickers por pedido de histórico em lote (get_historical_data_many)
+BATCH_SIZE = 50
+
+
 class DataProvider:
-    """Obtém dados históricos e em tempo real de ações usando yfinance."""
-    def __init__(self, start_date=None, end_date=None, period='1y', interval='1d'):
+    """
+    Obtém dados históricos e em tempo real de ações a partir de uma DataSource
+    (por omissão YFinanceSource; FileReplaySource serve snapshots locais sem rede).
+    O histórico é persistido num armazém OHLCV em disco (um ficheiro por ticker/intervalo);
+    com o armazém actualizado, get_historical_data não faz pedidos à rede e só
+    descarrega as barras em falta no fim da série quando esta fica desactualizada.
+    As cotações passam por uma QuoteCache (TTL em segundos, quote_ttl/quote_max_stale).
+    A cache em memória do histórico é uma LRU limitada a cache_max_bytes; os tickers
+    fixados com pin_tickers (portefólio, tabela principal) nunca são descartados.
+    Pode ser usado em simultâneo por várias threads (GUI e SuggestionWorker): pedidos
+    concorrentes do mesmo ticker/intervalo partilham um único download em curso.
+    Os pedidos à rede passam pelo FetchEngine (max_concurrency pedidos em simultâneo,
+    fetch_timeout segundos por ticker, max_retries com backoff exponencial).
+    Tickers sem dados (deslistados/inválidos) ficam numa cache negativa persistente
+    durante negative_ttl_days dias e são ignorados sem ir à rede (ver get_bad_tickers).
+    Com compact=True as séries devolvidas/guardadas em memória usam OHLC float32 e Volume
+    inteiro sem sinal (ver data/dtypes.py); o armazém em disco mantém a precisão total.
+    """
+    def __init__(self, start_date=None, end_date=None, period='1y', interval='1d', store_dir=OHLCV_STORE_DIR,
+                 quote_ttl=60, quote_max_stale=900, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES,
+                 max_concurrency=8, fetch_timeout=30.0, max_retries=3,
+                 negative_cache_file=NEGATIVE_CACHE_FILE, negative_ttl_days=7, source=None, compact=False):
+        self.source = source or YFinanceSource()
+        if not self.source.persistent:
+            # Dados de snapshots não devem contaminar o armazém nem a cache negativa reais
+            store_dir = None
+            negative_cache_file = None
         self.start_date = start_date
         self.end_date = end_date
         self.period = period
         self.interval = interval
-        self.cache = {}
+        # Modo compacto (opcional): séries em memória com OHLC float32 e Volume inteiro sem sinal
+        self.compact = compact
+        self.cache = FrameLRUCache(max_bytes=cache_max_bytes)
+        self.store = OHLCVStore(store_dir) if store_dir else None
+        self.quote_cache = QuoteCache(ttl=quote_ttl, max_stale=quote_max_stale)
+        self.engine = FetchEngine(max_concurrency=max_concurrency, timeout=fetch_timeout, max_retries=max_retries)
+        self.negative_cache = NegativeCache(negative_cache_file, ttl_days=negative_ttl_days)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
 
     def get_historical_data(self, ticker, refresh=False):
         ticker = ticker.upper()
-        if not refresh and ticker in self.cache:
-            return self.cache[ticker]
+        if self.negative_cache.is_bad(ticker):
+            return None
+        if not refresh:
+            cached = self.cache.get(ticker)
+            if cached is not None:
+                return cached
+        key = ('hist', ticker, self.interval, refresh)
+        future, owner = self._claim(key)
+        if not owner:
+            return future.result()
+        data = None
+        try:
+            data = self._load_history(ticker, refresh)
+        finally:
+            self._release(key, future, data)
+        return data
+
+    def _load_history(self, ticker, refresh):
+        if not refresh:
+            # Outra thread pode ter acabado de preencher a cache
+            cached = self.cache.get(ticker)
+            if cached is not None:
+                return cached
+        base, start = self._plan_fetch(ticker, refresh)
+        if base is None:
+            data = self._download(ticker)
+            if data is None:
+                return None
+            self._save_full(ticker, data)
+        elif start is None:
+            data = base
+        else:
+            data = self._merge_tail(ticker, base, self._download(ticker, start=start), start)
+        return self._finish(ticker, data)
+
+    def _plan_fetch(self, ticker, refresh):
+        """
+        Decide o que é preciso pedir à fonte. Devolve (base, start):
+        - (None, None): não há série utilizável, é preciso o histórico completo;
+        - (base, None): a série guardada já está actualizada;
+        - (base, start): basta pedir as barras a partir de `start` e juntá-las a `base`.
+        As barras em falta pedem-se a partir da penúltima barra guardada (ver _tail_start):
+        a última pode ter sido gravada a meio da sessão (incompleta) ou ter sido revista,
+        e a versão nova substitui-a; a penúltima serve para detectar um histórico reajustado.
+        Com refresh=True faz-se o mesmo sem olhar à frescura, em vez de descarregar de novo
+        todo o período.
+        """
+        base = self._load_stored(ticker)
+        if refresh:
+            if base is None:
+                base = self.cache.get(ticker)
+            if base is None:
+                return None, None
+            return base, self._tail_start(base)
+        if base is None:
+            return None, None
+        if self._is_fresh(base):
+            return base, None
+        return base, self._tail_start(base)
+
+    def _claim(self, key):
+        """
+        Regista um pedido em curso para `key`. Devolve (future, owner): se owner for True,
+        quem chamou faz o download e tem de chamar _release; caso contrário basta esperar
+        pelo resultado do future do pedido que já está a decorrer.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _release(self, key, future, result):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+
+    def pin_tickers(self, tickers):
+        """Impede que o histórico destes tickers seja descartado da cache em memória."""
+        self.cache.pin(t.upper() for t in tickers)
+
+    def unpin_tickers(self, tickers):
+        self.cache.unpin(t.upper() for t in tickers)
+
+    def get_historical_data_many(self, tickers, refresh=False, batch_size=BATCH_SIZE):
+        """
+        Obtém o histórico de vários tickers de uma vez.
+        Os tickers já em memória ou actualizados no armazém não vão à rede; os restantes
+        (histórico completo ou só as barras em falta, agrupados pela data de início) são
+        pedidos em lotes de `batch_size` tickers, um pedido à fonte por lote (yf.download),
+        e cada lote é um pedido do FetchEngine (timeout e repetição com backoff).
+        Devolve {ticker: DataFrame ou None} e deixa a cache preenchida para chamadas
+        seguintes a get_historical_data.
+        """
+        result = {}
+        owned = {}
+        waiting = {}
+        pending = {}
+        try:
+            for ticker in dict.fromkeys(t.upper() for t in tickers):
+                if self.negative_cache.is_bad(ticker):
+                    result[ticker] = None
+                    continue
+                if not refresh:
+                    cached = self.cache.get(ticker)
+                    if cached is not None:
+                        result[ticker] = cached
+                        continue
+                key = ('hist', ticker, self.interval, refresh)
+                future, owner = self._claim(key)
+                if not owner:
+                    waiting[ticker] = future
+                    continue
+                owned[ticker] = (key, future)
+                base, start = self._plan_fetch(ticker, refresh)
+                if base is not None and start is None:
+                    result[ticker] = self._finish(ticker, base)
+                else:
+                    pending[ticker] = (base, start)
+
+            by_start = {}
+            for ticker, (base, start) in pending.items():
+                by_start.setdefault(start, []).append(ticker)
+            calls = {}
+            for start, group in by_start.items():
+                for i in range(0, len(group), batch_size):
+                    batch = group[i:i + batch_size]
+                    calls[f"lote {len(calls) + 1} ({len(batch)} tickers)"] = (
+                        self._fetch_history_batch, (batch, start), {})
+            frames = {}
+            for batch_frames in self.engine.run(calls).values():
+                frames.update(batch_frames or {})
+            for ticker, (base, start) in pending.items():
+                data = frames.get(ticker)
+                if base is not None:
+                    result[ticker] = self._finish(ticker, self._merge_tail(ticker, base, data, start))
+                elif data is None:
+                    result[ticker] = None
+                else:
+                    self._save_full(ticker, data)
+                    result[ticker] = self._finish(ticker, data)
+        finally:
+            for ticker, (key, future) in owned.items():
+                self._release(key, future, result.get(ticker))
+        for ticker, future in waiting.items():
+            result[ticker] = future.result()
+        return result
+
+    def _download(self, ticker, start=None):
+        return self.engine.call(self._fetch_history, ticker, start, key=ticker)
+
+    def _fetch_history(self, ticker, start=None):
+        """
+        Pedido de histórico de um ticker (corre numa thread do FetchEngine).
+        Um download do período completo (period=) sem dados marca o ticker na cache
+        negativa; um pedido só das barras em falta ou de uma janela start/end escolhida
+        pode legitimamente vir vazio e não marca nada.
+        """
         try:
-            logger.info(f"Fetching historical data for {ticker}")
-            if self.start_date and self.end_date:
-                data = yf.download(ticker, start=self.start_date, end=self.end_date, interval=self.interval)
+            if start is not None:
+                logger.info(f"Fetching missing bars for {ticker} since {start}")
+                data = self.source.history(ticker, self.interval, start=start, end=self.end_date)
+            elif self.start_date and self.end_date:
+                logger.info(f"Fetching historical data for {ticker}")
+                data = self.source.history(ticker, self.interval, start=self.start_date, end=self.end_date)
             else:
-                data = yf.download(ticker, period=self.period, interval=self.interval)
+                logger.info(f"Fetching historical data for {ticker}")
+                data = self.source.history(ticker, self.interval, period=self.period)
         except Exception as e:
-            logger.error(f"Erro ao obter dados para {ticker}: {e}")
+            if not is_missing_symbol_error(e):
+                raise
+            if self._marks_missing(start):
+                self.negative_cache.mark(ticker, e)
             return None
+        if data is None and self._marks_missing(start):
+            self.negative_cache.mark(ticker, "sem dados")
+        return data
 
-        if isinstance(data, pd.DataFrame) and not data.empty:
-            # Suporte para MultiIndex no yfinance (evita bugs)
-            if isinstance(data.columns, pd.MultiIndex):
-                data.columns = data.columns.get_level_values(0)
-            # Garante sempre coluna 'Close'
-            if 'Adj Close' in data.columns and 'Close' not in data.columns:
-                data['Close'] = data['Adj Close']
-            if not isinstance(data.index, pd.DatetimeIndex):
-                data.index = pd.to_datetime(data.index)
-            if data.index.tz is not None:
-                data.index = data.index.tz_convert(None)
-            data.index.name = 'Date'
-            self.cache[ticker] = data
-            return data
+    def _fetch_history_batch(self, tickers, start=None):
+        """
+        Pedido de histórico de um lote de tickers (corre numa thread do FetchEngine).
+        Devolve {ticker: DataFrame ou None}; as regras da cache negativa são as de _fetch_history.
+        """
+        logger.info(f"Fetching historical data for {len(tickers)} tickers (batch)")
+        if start is not None:
+            frames, errors = self.source.history_many(tickers, self.interval, start=start, end=self.end_date)
+        elif self.start_date and self.end_date:
+            frames, errors = self.source.history_many(tickers, self.interval, start=self.start_date,
+                                                      end=self.end_date)
         else:
+            frames, errors = self.source.history_many(tickers, self.interval, period=self.period)
+        if self._marks_missing(start):
+            for ticker in tickers:
+                if frames.get(ticker) is not None:
+                    continue
+                error = errors.get(ticker)
+                if error is None or is_missing_symbol_error(error):
+                    self.negative_cache.mark(ticker, error or "sem dados")
+        return frames
+
+    def _marks_missing(self, start):
+        """Indica se um pedido sem dados deve marcar o ticker: só o do período completo (period=)."""
+        return start is None and not (self.start_date and self.end_date)
+
+    def get_bad_tickers(self):
+        """Tickers actualmente na cache negativa (DataFrame), para os retirar dos universos."""
+        return self.negative_cache.list_bad()
+
+    def _load_stored(self, ticker):
+        """Lê a série do armazém se esta cobrir a janela pedida."""
+        if self.store is None:
             return None
+        stored = self.store.load(ticker, self.interval)
+        if stored is not None and not self._covers_window(stored):
+            return None
+        return stored
+
+    def _save_full(self, ticker, data):
+        if self.store is not None:
+            data.attrs['covered_from'] = str(self._requested_start() or data.index[0])
+            data.attrs['fetched_at'] = str(self.source.now())
+            self.store.save(ticker, self.interval, data)
+
+    def _tail_start(self, stored):
+        """Início do pedido das barras em falta: a penúltima barra guardada (ou a única)."""
+        return stored.index[-2] if len(stored) > 1 else stored.index[-1]
+
+    def _merge_tail(self, ticker, base, tail, start):
+        """
+        Junta à série as barras a partir de `start` (as novas substituem as existentes).
+        Se as barras já fechadas vierem com outros valores (split/dividendo reajustou o
+        histórico na fonte), descarrega de novo o período completo em vez de juntar.
+        """
+        if tail is None:
+            return base
+        tail = tail[tail.index >= start]
+        if tail.empty:
+            return base
+        if history_revised(base, tail):
+            logger.info(f"Histórico de {ticker} reajustado na fonte; nova descarga completa")
+            data = self._download(ticker)
+            if data is None:
+                return base
+            self._save_full(ticker, data)
+            return data
+        merged = merge_bars(base, tail)
+        if self.store is not None:
+            merged.attrs['fetched_at'] = str(self.source.now())
+            self.store.save(ticker, self.interval, merged)
+        return merged
+
+    def _finish(self, ticker, data):
+        window = self._slice_window(data)
+        if window is None or window.empty:
+            return None
+        if self.compact:
+            data = compact_ohlcv(data)
+            window = self._slice_window(data)
+        # Identificação da série, usada nas chaves da cache de indicadores
+        for frame in (data, window):
+            frame.attrs['ticker'] = ticker
+            frame.attrs['interval'] = self.interval
+        # As features da janela são calculadas sobre a série completa, cujo início não desliza
+        indicator_cache.register_history(data)
+        self.cache[ticker] = window
+        return window
+
+    def _requested_start(self):
+        if self.start_date:
+            return pd.Timestamp(self.start_date)
+        return period_start(self.period, self.source.now())
+
+    def _covers_window(self, stored):
+        """Verifica se a série guardada cobre o início da janela pedida."""
+        start = self._requested_start()
+        if start is None:
+            return True
+        covered_from = pd.Timestamp(stored.attrs.get('covered_from', stored.index[0]))
+        return covered_from <= start + COVERAGE_TOLERANCE
+
+    def _bar_delta(self):
+        return INTRADAY_DELTAS.get(self.interval) or LONG_INTERVAL_DELTAS.get(self.interval, pd.Timedelta(days=1))
+
+    def _is_fresh(self, stored):
+        """Indica se a última barra guardada já é a mais recente esperada (sem ir à rede)."""
+        last_ts = stored.index[-1]
+        if self.end_date:
+            return last_ts >= pd.Timestamp(self.end_date) - pd.offsets.BDay(1)
+        now = self.source.now()
+        # Barra gravada antes do fim do seu período (ex.: diária a meio da sessão): estava
+        # incompleta e, terminado o período, tem de ser pedida de novo
+        bar_end = last_ts + self._bar_delta()
+        fetched_at = stored.attrs.get('fetched_at')
+        if fetched_at is not None and pd.Timestamp(fetched_at) < bar_end <= now:
+            return False
+        if self.interval in INTRADAY_DELTAS:
+            return now - last_ts <= INTRADAY_DELTAS[self.interval]
+        if self.interval in LONG_INTERVAL_DELTAS:
+            return now - last_ts < LONG_INTERVAL_DELTAS[self.interval]
+        # Diário: basta ter a barra do último dia útil anterior a hoje
+        return last_ts.normalize() >= now.normalize() - pd.offsets.BDay(1)
+
+    def _slice_window(self, data):
+        start = self._requested_start()
+        if start is not None:
+            data = data[data.index >= start]
+        if self.end_date:
+            data = data[data.index < pd.Timestamp(self.end_date)]
+        return data
 
     def get_current_price(self, ticker):
-        ticker = ticker.upper()
+        return self.get_current_prices([ticker]).get(ticker.upper())
+
+    def get_current_prices(self, tickers, refresh=False):
+        """
+        Obtém o último preço de vários tickers. As cotações recentes vêm da QuoteCache;
+        as ligeiramente desactualizadas são devolvidas logo e refrescadas numa thread em
+        segundo plano; só as que faltam são pedidas à rede (um único pedido para todas).
+        Com refresh=True ignora a cache e pede tudo à rede. Devolve {ticker: preço ou None}.
+        """
+        requested = list(dict.fromkeys(t.upper() for t in tickers))
+        tickers = self.negative_cache.prune(requested)
+        if not tickers:
+            return {t: None for t in requested}
+        if refresh:
+            prices, to_refresh, missing = {}, [], tickers
+        else:
+            prices, to_refresh, missing = self.quote_cache.lookup(tickers)
+        if to_refresh:
+            threading.Thread(target=self._refresh_quotes, args=(to_refresh,), daemon=True).start()
+        if missing:
+            owned, waiting = {}, {}
+            for ticker in missing:
+                key = ('quote', ticker, refresh)
+                future, owner = self._claim(key)
+                if owner:
+                    owned[ticker] = (key, future)
+                else:
+                    waiting[ticker] = future
+            fetched = {}
+            try:
+                if owned:
+                    fetched = self._fetch_prices(list(owned))
+                    self.quote_cache.put_many(fetched)
+            finally:
+                for ticker, (key, future) in owned.items():
+                    self._release(key, future, fetched.get(ticker))
+            prices.update(fetched)
+            for ticker, future in waiting.items():
+                prices[ticker] = future.result()
+        return {t: prices.get(t) for t in requested}
+
+    def get_quote_cache_stats(self):
+        return self.quote_cache.stats()
+
+    def _refresh_quotes(self, tickers):
         try:
-            yfticker = yf.Ticker(ticker)
-            info = yfticker.info
-            price = info.get('regularMarketPrice') or info.get('currentPrice')
-            if price is None:
-                hist = yfticker.history(period="1d", interval="1m")
-                if not hist.empty:
-                    price = float(hist['Close'].iloc[-1])
-            return float(price) if price is not None else None
-        except Exception as e:
-            logger.error(f"Erro ao obter preço atual para {ticker}: {e}")
-            return None
+            self.quote_cache.put_many(self._fetch_prices(tickers))
+        finally:
+            self.quote_cache.release_refresh(tickers)
+
+    def _fetch_prices(self, tickers):
+        return self.engine.call(self.source.last_prices, tickers, key="cotações") or {}
@@ -0,0 +1,83 @@
+"""
+Modo compacto de tipos (opcional): OHLC em float32, Volume em inteiro sem sinal e
+features em float32, para reduzir a memória das caches de histórico e de indicadores
+(cerca de metade por coluna).
+
+Cada conversão é verificada: se o erro relativo máximo de uma coluna ultrapassar
+`rtol` (ex.: preços demasiado grandes para a precisão do float32) ou se o Volume não
+for inteiro e não negativo, essa coluna fica no tipo original e o facto é registado.
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close']
+COMPACT_RTOL = 1e-6
+
+
+def _max_rel_error(original, converted):
+    a = np.asarray(original, dtype=float)
+    b = np.asarray(converted, dtype=float)
+    mask = ~np.isnan(a)
+    if not mask.any():
+        return 0.0
+    if not np.array_equal(mask, ~np.isnan(b)):
+        return np.inf
+    return float(np.max(np.abs(a[mask] - b[mask]) / np.maximum(np.abs(a[mask]), 1e-12)))
+
+
+def _to_float32(series, rtol, label):
+    if series.dtype == np.float32:
+        return series
+    converted = series.astype(np.float32)
+    error = _max_rel_error(series, converted)
+    if error > rtol:
+        logger.warning(f"Modo compacto: {label} mantém {series.dtype} (erro relativo {error:.2e} > {rtol:.0e})")
+        return series
+    return converted
+
+
+def _to_unsigned(volume, label):
+    values = volume.to_numpy(dtype=float)
+    if volume.dtype.kind == 'u':
+        return volume
+    if np.isnan(values).any() or (values < 0).any() or not np.array_equal(values, np.round(values)):
+        logger.warning(f"Modo compacto: {label} não é inteiro não negativo; mantém {volume.dtype}")
+        return volume
+    dtype = np.uint32 if values.size == 0 or values.max() <= np.iinfo(np.uint32).max else np.uint64
+    return volume.astype(dtype)
+
+
+def compact_ohlcv(data, rtol=COMPACT_RTOL):
+    """Devolve uma cópia do DataFrame OHLCV com preços em float32 e Volume em uint32/uint64."""
+    if data is None or data.empty:
+        return data
+    ticker = data.attrs.get('ticker', '')
+    out = data.copy()
+    for col in PRICE_COLUMNS:
+        if col in out.columns:
+            out[col] = _to_float32(out[col], rtol, f"{ticker} {col}".strip())
+    if 'Volume' in out.columns:
+        out['Volume'] = _to_unsigned(out['Volume'], f"{ticker} Volume".strip())
+    return out
+
+
+def compact_features(features, rtol=COMPACT_RTOL):
+    """Devolve uma cópia do DataFrame de features com as colunas float em float32."""
+    if features is None or features.empty:
+        return features
+    out = features.copy()
+    for col in out.columns:
+        if out[col].dtype.kind == 'f':
+            out[col] = _to_float32(out[col], rtol, f"feature {col}")
+    return out
+
+
+def memory_savings(before, after):
+    """(bytes antes, bytes depois, fracção poupada) entre duas versões de um DataFrame."""
+    size_before = int(before.memory_usage(deep=True, index=True).sum())
+    size_after = int(after.memory_usage(deep=True, index=True).sum())
+    saved = 1 - size_after / size_before if size_before else 0.0
+    return size_before, size_after, saved
@@ -0,0 +1,103 @@
+import asyncio
+import inspect
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_MARKERS = ("429", "too many requests", "rate limit", "ratelimit")
+
+
+def is_throttle_error(exc):
+    """Indica se a excepção corresponde a limitação de pedidos (HTTP 429 / rate limit)."""
+    if "ratelimit" in type(exc).__name__.lower():
+        return True
+    msg = str(exc).lower()
+    return any(marker in msg for marker in THROTTLE_MARKERS)
+
+
+class FetchEngine:
+    """
+    Motor assíncrono de pedidos de dados (asyncio).
+    Executa muitos pedidos em simultâneo, até max_concurrency de cada vez, com um
+    timeout por pedido (timeout, em segundos) e repetição com backoff exponencial
+    (backoff_base * 2^tentativa, com jitter, limitado a backoff_max) quando o pedido
+    falha por limitação de pedidos ou por timeout. Outros erros não são repetidos.
+
+    As funções de pedido podem ser síncronas (correm numa pool de threads) ou
+    corrotinas (são aguardadas directamente), o que permite testar o motor com um
+    fornecedor falso ou um servidor HTTP local. Os métodos run/call são os
+    invólucros síncronos usados pelo DataProvider; podem ser chamados também de uma
+    thread que já tem um event loop a correr (Jupyter, qasync).
+    """
+    def __init__(self, max_concurrency=8, timeout=30.0, max_retries=3, backoff_base=1.0, backoff_max=30.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetch")
+
+    async def _attempt(self, func, args, kwargs):
+        if inspect.iscoroutinefunction(func):
+            return await asyncio.wait_for(func(*args, **kwargs), self.timeout)
+        loop = asyncio.get_running_loop()
+        # Um pedido síncrono que exceda o timeout não é interrompido; apenas deixa de ser esperado.
+        return await asyncio.wait_for(loop.run_in_executor(self._executor, lambda: func(*args, **kwargs)),
+                                      self.timeout)
+
+    async def fetch(self, key, func, *args, semaphore=None, **kwargs):
+        """Executa um pedido com timeout e backoff; devolve None se falhar definitivamente."""
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                try:
+                    return await self._attempt(func, args, kwargs)
+                except asyncio.TimeoutError:
+                    reason = f"timeout ({self.timeout}s)"
+                except Exception as e:
+                    if not is_throttle_error(e):
+                        logger.error(f"Erro no pedido de {key}: {e}")
+                        return None
+                    reason = f"limite de pedidos ({e})"
+            if attempt == self.max_retries:
+                logger.error(f"Pedido de {key} falhou após {attempt + 1} tentativas: {reason}")
+                return None
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.warning(f"Pedido de {key}: {reason}; nova tentativa em {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return None
+
+    async def gather(self, calls):
+        """
+        Executa vários pedidos em simultâneo.
+        calls: {chave: (func, args, kwargs)}. Devolve {chave: resultado ou None}.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        keys = list(calls)
+        results = await asyncio.gather(*(
+            self.fetch(key, calls[key][0], *calls[key][1], semaphore=semaphore, **calls[key][2])
+            for key in keys
+        ))
+        return dict(zip(keys, results))
+
+    def _run_sync(self, coro):
+        """Corre a corrotina até ao fim num event loop próprio e devolve o resultado."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Esta thread já tem um event loop a correr (asyncio.run falharia): usa uma thread à parte
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetch-loop") as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+    def run(self, calls):
+        """Invólucro síncrono de gather (cria um event loop próprio)."""
+        if not calls:
+            return {}
+        return self._run_sync(self.gather(calls))
+
+    def call(self, func, *args, key=None, **kwargs):
+        """Invólucro síncrono para um único pedido."""
+        return self._run_sync(self.fetch(key or getattr(func, "__name__", "pedido"), func, *args, **kwargs))
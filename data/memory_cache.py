@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import sys
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+
+def frame_nbytes(data):
+    """
+    Memória ocupada por um DataFrame/Series (inclui o índice), ou por um tuplo/dicionário deles.
+    Outros objetos (ex.: números de um dicionário de métricas) contam pelo sys.getsizeof.
+    """
+    if isinstance(data, dict):
+        return sum(frame_nbytes(v) for v in data.values())
+    if isinstance(data, (tuple, list)):
+        return sum(frame_nbytes(v) for v in data)
+    if not hasattr(data, "memory_usage"):
+        return sys.getsizeof(data)
+    try:
+        usage = data.memory_usage(deep=True, index=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    except Exception:
+        return 0
+
+
+class FrameLRUCache:
+    """
+    Cache em memória de DataFrames por ticker, limitada em bytes (não em número de entradas).
+    Quando o total ultrapassa max_bytes, descarta as entradas menos usadas recentemente;
+    os tickers fixados (pin) nunca são descartados. Cada descarte é registado no logger.
+    Usa-se como um dicionário: `ticker in cache`, `cache[ticker]`, `cache[ticker] = df`.
+    Todas as operações são protegidas por um lock; entre threads prefira `cache.get(ticker)`
+    a `ticker in cache` seguido de `cache[ticker]`, que pode falhar se houver um descarte entretanto.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_MAX_BYTES, label="Cache de histórico"):
+        self.max_bytes = max_bytes
+        self.label = label
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._pinned = set()
+        self.total_bytes = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = self._entries[key]
+            self._entries.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        size = frame_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self.total_bytes += size
+            self._evict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self[key] if key in self._entries else default
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self.total_bytes -= self._sizes.pop(key)
+            return self._entries.pop(key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def pin(self, keys):
+        with self._lock:
+            self._pinned.update(keys)
+
+    def unpin(self, keys):
+        with self._lock:
+            self._pinned.difference_update(keys)
+            self._evict()
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in list(self._entries.keys()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self._pinned:
+                continue
+            size = self._sizes[key]
+            self.pop(key)
+            self.evictions += 1
+            logger.info(f"{self.label}: removido {key} ({size / 1024:.0f} KB); "
+                        f"ocupação {self.total_bytes / 1024 ** 2:.1f}/{self.max_bytes / 1024 ** 2:.0f} MB")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "pinned": len(self._pinned),
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,101 @@
+import os
+import threading
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NEGATIVE_CACHE_FILE = "negative_cache.csv"
+# Mensagens do yfinance para um símbolo inexistente/deslistado (ex.: "AAA: possibly delisted;
+# no timezone found"); genéricas como "404" ou "not found" também aparecem em falhas transitórias
+MISSING_SYMBOL_MARKERS = (
+    "possibly delisted", "symbol may be delisted", "no timezone found", "quote not found for symbol",
+)
+# Excepções do yfinance com o mesmo significado (os erros de yf.download chegam como texto)
+MISSING_SYMBOL_ERRORS = ("YFTzMissingError", "YFPricesMissingError", "YFTickerMissingError")
+
+
+def is_missing_symbol_error(exc):
+    """Indica se o erro do yfinance significa que o símbolo não existe ou não tem dados."""
+    if type(exc).__name__ in MISSING_SYMBOL_ERRORS:
+        return True
+    msg = str(exc)
+    return (any(name in msg for name in MISSING_SYMBOL_ERRORS)
+            or any(marker in msg.lower() for marker in MISSING_SYMBOL_MARKERS))
+
+
+class NegativeCache:
+    """
+    Registo persistente (CSV) de tickers sem dados (deslistados ou inválidos).
+    Cada entrada expira ao fim de ttl_days dias, para que o símbolo volte a ser verificado.
+    Enquanto válida, o DataProvider não faz pedidos à rede para esse ticker.
+    Com filename=None o registo fica só em memória.
+    """
+    COLUMNS = ["ticker", "reason", "first_seen", "last_seen", "failures"]
+
+    def __init__(self, filename=NEGATIVE_CACHE_FILE, ttl_days=7):
+        self.filename = filename
+        self.ttl = pd.Timedelta(days=ttl_days)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.load()
+
+    def load(self):
+        self._entries = {}
+        if not self.filename or not os.path.isfile(self.filename):
+            return
+        try:
+            df = pd.read_csv(self.filename, parse_dates=["first_seen", "last_seen"])
+        except Exception as e:
+            logger.warning(f"Cache negativa inválida ({self.filename}): {e}")
+            return
+        for row in df.to_dict("records"):
+            self._entries[row["ticker"]] = row
+
+    def save(self):
+        if not self.filename:
+            return
+        df = pd.DataFrame(list(self._entries.values()), columns=self.COLUMNS)
+        tmp_path = f"{self.filename}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.filename)
+
+    def _is_valid(self, entry, now):
+        return now - pd.Timestamp(entry["last_seen"]) < self.ttl
+
+    def is_bad(self, ticker):
+        with self._lock:
+            entry = self._entries.get(ticker)
+            return entry is not None and self._is_valid(entry, pd.Timestamp.now())
+
+    def mark(self, ticker, reason):
+        now = pd.Timestamp.now()
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                entry = {"ticker": ticker, "first_seen": now, "failures": 0}
+            entry.update(reason=str(reason)[:200], last_seen=now, failures=int(entry["failures"]) + 1)
+            self._entries[ticker] = entry
+            # Aproveita para descartar entradas expiradas
+            self._entries = {t: e for t, e in self._entries.items() if self._is_valid(e, now)}
+            self.save()
+        logger.warning(f"{ticker} marcado como sem dados ({reason}); ignorado durante {self.ttl.days} dias")
+
+    def clear(self, ticker):
+        with self._lock:
+            if self._entries.pop(ticker, None) is not None:
+                self.save()
+
+    def list_bad(self):
+        """DataFrame com os tickers actualmente marcados (para limpar os ficheiros de universo)."""
+        now = pd.Timestamp.now()
+        with self._lock:
+            rows = [e for e in self._entries.values() if self._is_valid(e, now)]
+        df = pd.DataFrame(rows, columns=self.COLUMNS)
+        if not df.empty:
+            df["expires"] = pd.to_datetime(df["last_seen"]) + self.ttl
+        return df.sort_values("ticker").reset_index(drop=True)
+
+    def prune(self, tickers):
+        """Devolve a lista de tickers sem os que estão marcados como inválidos."""
+        return [t for t in tickers if not self.is_bad(str(t).upper())]
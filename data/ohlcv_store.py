@@ -0,0 +1,120 @@
+import os
+import threading
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OHLCV_STORE_DIR = "ohlcv_store"
+# Diferença relativa no fecho a partir da qual uma barra já guardada conta como revista
+# (o Yahoo reajusta todo o histórico depois de um split ou dividendo)
+ADJUSTMENT_RTOL = 1e-4
+
+
+def _parquet_engine():
+    """Devolve o motor Parquet disponível (pyarrow ou fastparquet) ou None."""
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+            return engine
+        except ImportError:
+            continue
+    return None
+
+
+def merge_bars(stored, new_rows):
+    """Junta novas barras a uma série (as novas prevalecem em datas repetidas)."""
+    if new_rows is None or new_rows.empty:
+        return stored
+    if stored is None or stored.empty:
+        return new_rows
+    merged = pd.concat([stored, new_rows])
+    merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+    merged.attrs = dict(stored.attrs)
+    return merged
+
+
+def history_revised(stored, new_rows, rtol=ADJUSTMENT_RTOL):
+    """
+    Indica se as barras fechadas de `stored` (todas menos a última, que pode ter sido
+    gravada a meio da sessão) vêm com outro fecho em `new_rows`. Nesse caso o histórico
+    foi reajustado na fonte e juntar só a cauda deixaria um salto falso na série.
+    """
+    if new_rows is None or new_rows.empty or 'Close' not in stored.columns or 'Close' not in new_rows.columns:
+        return False
+    common = stored.index[:-1].intersection(new_rows.index)
+    if common.empty:
+        return False
+    old = stored.loc[common, 'Close'].to_numpy(dtype=float)
+    new = new_rows.loc[common, 'Close'].to_numpy(dtype=float)
+    return not np.isclose(new, old, rtol=rtol, atol=0, equal_nan=True).all()
+
+
+class OHLCVStore:
+    """
+    Armazém persistente de séries OHLCV em disco.
+    Guarda um ficheiro colunar (Parquet) por ticker/intervalo em
+    <root>/<interval>/<TICKER>.parquet. Se não houver motor Parquet instalado,
+    recorre a pickle (.pkl), que continua a ser muito rápido a carregar.
+    """
+    def __init__(self, root=OHLCV_STORE_DIR):
+        self.root = root
+        self.engine = _parquet_engine()
+        self.ext = ".parquet" if self.engine else ".pkl"
+
+    def path(self, ticker, interval):
+        safe_ticker = ticker.upper().replace("/", "_").replace("\\", "_")
+        return os.path.join(self.root, interval, f"{safe_ticker}{self.ext}")
+
+    def load(self, ticker, interval):
+        """Lê a série guardada; devolve None se não existir ou estiver corrompida."""
+        path = self.path(ticker, interval)
+        if not os.path.isfile(path):
+            return None
+        try:
+            if self.engine:
+                data = pd.read_parquet(path, engine=self.engine)
+            else:
+                data = pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"Ficheiro OHLCV inválido para {ticker} ({path}): {e}")
+            return None
+        if data is None or data.empty:
+            return None
+        data.index.name = 'Date'
+        return data
+
+    def save(self, ticker, interval, data):
+        """Grava a série de forma atómica (ficheiro temporário + os.replace)."""
+        if data is None or data.empty:
+            return
+        path = self.path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if self.engine:
+                data.to_parquet(tmp_path, engine=self.engine)
+            else:
+                data.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar dados OHLCV de {ticker} em {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def append(self, ticker, interval, stored, new_rows):
+        """
+        Junta novas barras à série guardada (as novas prevalecem em datas repetidas),
+        grava e devolve a série resultante.
+        """
+        if new_rows is None or new_rows.empty:
+            return stored
+        merged = merge_bars(stored, new_rows)
+        self.save(ticker, interval, merged)
+        return merged
+
+    def delete(self, ticker, interval):
+        path = self.path(ticker, interval)
+        if os.path.isfile(path):
+            os.remove(path)
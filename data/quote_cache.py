@@ -0,0 +1,82 @@
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteCache:
+    """
+    Cache de cotações com TTL e "stale-while-revalidate".
+    - Cotação com idade <= ttl: devolvida directamente (hit).
+    - Idade entre ttl e max_stale: devolvida logo (stale hit) e marcada para refrescar em segundo plano.
+    - Sem cotação ou mais velha que max_stale: miss, tem de ser obtida de forma síncrona.
+    Os contadores (hits, stale_hits, misses, refreshes) ajudam a afinar o TTL.
+    """
+    def __init__(self, ttl=60, max_stale=900):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def lookup(self, tickers):
+        """
+        Divide os tickers em (preços disponíveis, tickers a refrescar em segundo plano, tickers em falta).
+        Os tickers a refrescar ficam reservados até release_refresh ser chamado.
+        """
+        now = time.monotonic()
+        prices, to_refresh, missing = {}, [], []
+        with self._lock:
+            for ticker in tickers:
+                entry = self._entries.get(ticker)
+                age = now - entry[1] if entry else None
+                if entry is None or age > self.max_stale:
+                    self.misses += 1
+                    missing.append(ticker)
+                    continue
+                prices[ticker] = entry[0]
+                if age <= self.ttl:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if ticker not in self._refreshing:
+                        self._refreshing.add(ticker)
+                        to_refresh.append(ticker)
+        return prices, to_refresh, missing
+
+    def put_many(self, prices):
+        now = time.monotonic()
+        with self._lock:
+            for ticker, price in prices.items():
+                if price is not None:
+                    self._entries[ticker] = (price, now)
+
+    def release_refresh(self, tickers):
+        with self._lock:
+            self._refreshing.difference_update(tickers)
+            self.refreshes += 1
+
+    def invalidate(self, tickers=None):
+        with self._lock:
+            if tickers is None:
+                self._entries.clear()
+            else:
+                for ticker in tickers:
+                    self._entries.pop(ticker, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0,
+            }
@@ -0,0 +1,276 @@
+"""
+Fontes de dados usadas pelo DataProvider.
+
+DataSource define a interface (histórico OHLCV de um ticker, últimos preços de vários
+tickers e a data "actual" da fonte). YFinanceSource é a fonte real (yfinance);
+FileReplaySource serve snapshots CSV/Parquet locais, sem rede, para benchmarks e
+testes determinísticos de scans, backtests e GUI.
+"""
+
+import os
+import re
+import threading
+import logging
+import pandas as pd
+import yfinance as yf
+
+from data.negative_cache import is_missing_symbol_error
+from data.fetch_engine import is_throttle_error
+
+logger = logging.getLogger(__name__)
+
+INTRADAY_DELTAS = {
+    '1m': pd.Timedelta(minutes=1), '2m': pd.Timedelta(minutes=2), '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15), '30m': pd.Timedelta(minutes=30), '60m': pd.Timedelta(hours=1),
+    '90m': pd.Timedelta(minutes=90), '1h': pd.Timedelta(hours=1),
+}
+# Colunas de eventos devolvidas por Ticker.history que não fazem parte do OHLCV
+EVENT_COLUMNS = ['Dividends', 'Stock Splits', 'Capital Gains']
+# yf.download guarda o resultado em estado global do módulo: chamadas simultâneas
+# de threads diferentes misturam resultados, por isso são serializadas.
+# O histórico de um ticker usa yf.Ticker(...).history, que não partilha estado entre pedidos;
+# o de vários tickers de uma vez usa yf.download (um pedido por lote).
+_YF_DOWNLOAD_LOCK = threading.Lock()
+# Preços ajustados a splits/dividendos e sem coluna 'Adj Close', nos dois caminhos
+# (é o comportamento por omissão de Ticker.history e, desde o yfinance 0.2.51, de yf.download)
+AUTO_ADJUST = True
+
+
+def _yf_download(*args, errors=None, **kwargs):
+    """yf.download serializado; `errors` (dict opcional) recebe os erros por ticker do pedido."""
+    with _YF_DOWNLOAD_LOCK:
+        data = yf.download(*args, **kwargs)
+        if errors is not None:
+            errors.update(getattr(getattr(yf, "shared", None), "_ERRORS", None) or {})
+        return data
+
+
+def normalize_history(data, interval='1d'):
+    """Normaliza um DataFrame OHLCV (colunas, 'Close', índice 'Date' sem fuso)."""
+    if not isinstance(data, pd.DataFrame) or data.empty:
+        return None
+    # Suporte para MultiIndex no yfinance (evita bugs)
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    data = data.drop(columns=[c for c in EVENT_COLUMNS if c in data.columns])
+    # Garante sempre coluna 'Close'
+    if 'Adj Close' in data.columns and 'Close' not in data.columns:
+        data['Close'] = data['Adj Close']
+    if not isinstance(data.index, pd.DatetimeIndex):
+        data.index = pd.to_datetime(data.index)
+    if data.index.tz is not None:
+        # Barras diárias mantêm a data local da bolsa; intradiárias passam a UTC
+        if interval in INTRADAY_DELTAS:
+            data.index = data.index.tz_convert(None)
+        else:
+            data.index = data.index.tz_localize(None)
+    data.index.name = 'Date'
+    return data
+
+
+def period_start(period, now=None):
+    """Converte um período yfinance ('1y', '6mo', '5d', 'ytd', 'max') na data de início."""
+    now = (now or pd.Timestamp.now()).normalize()
+    if not period or period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=now.year, month=1, day=1)
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        return None
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        return now - pd.Timedelta(days=n)
+    if unit == 'wk':
+        return now - pd.Timedelta(weeks=n)
+    if unit == 'mo':
+        return now - pd.DateOffset(months=n)
+    return now - pd.DateOffset(years=n)
+
+
+class DataSource:
+    """
+    Interface de uma fonte de dados de mercado.
+    - history: DataFrame OHLCV normalizado de um ticker (ou None se não houver dados);
+      pode lançar excepções, que o FetchEngine trata (limite de pedidos, timeouts).
+    - history_many: o mesmo para vários tickers, idealmente num só pedido; devolve
+      ({ticker: DataFrame ou None}, {ticker: mensagem de erro}).
+    - last_prices: {ticker: último preço} para vários tickers, idealmente num só pedido.
+    - now: data/hora de referência da fonte (para janelas por período e frescura do armazém).
+    persistent=False indica que os dados não devem ir para o armazém OHLCV nem para a
+    cache negativa em disco (ex.: snapshots de teste).
+    """
+    name = "base"
+    persistent = True
+
+    def history(self, ticker, interval, start=None, end=None, period=None):
+        raise NotImplementedError("Subclasses devem implementar history()")
+
+    def history_many(self, tickers, interval, start=None, end=None, period=None):
+        """Por omissão, um pedido history() por ticker."""
+        frames, errors = {}, {}
+        for ticker in tickers:
+            try:
+                frames[ticker] = self.history(ticker, interval, start=start, end=end, period=period)
+            except Exception as e:
+                if not is_missing_symbol_error(e):
+                    raise
+                frames[ticker] = None
+                errors[ticker] = str(e)
+        return frames, errors
+
+    def last_prices(self, tickers):
+        raise NotImplementedError("Subclasses devem implementar last_prices()")
+
+    def now(self):
+        return pd.Timestamp.now()
+
+
+class YFinanceSource(DataSource):
+    """Fonte real: Yahoo Finance através do yfinance."""
+    name = "yfinance"
+
+    def history(self, ticker, interval, start=None, end=None, period=None):
+        yfticker = yf.Ticker(ticker)
+        if start is not None:
+            data = yfticker.history(start=start, end=end, interval=interval, auto_adjust=AUTO_ADJUST,
+                                    raise_errors=True)
+        else:
+            data = yfticker.history(period=period, interval=interval, auto_adjust=AUTO_ADJUST, raise_errors=True)
+        return normalize_history(data, interval)
+
+    def history_many(self, tickers, interval, start=None, end=None, period=None):
+        """Um único pedido yf.download para o lote; o resultado MultiIndex é separado por ticker."""
+        kwargs = dict(interval=interval, group_by='column', auto_adjust=AUTO_ADJUST, threads=True, progress=False)
+        if start is not None:
+            kwargs.update(start=start, end=end)
+        else:
+            kwargs.update(period=period)
+        errors = {}
+        data = _yf_download(list(tickers), errors=errors, **kwargs)
+        frames = {ticker: None for ticker in tickers}
+        if isinstance(data, pd.DataFrame) and not data.empty:
+            if not isinstance(data.columns, pd.MultiIndex):
+                if len(tickers) == 1:
+                    frames[tickers[0]] = normalize_history(data, interval)
+            else:
+                available = set(data.columns.get_level_values(1))
+                for ticker in tickers:
+                    if ticker in available:
+                        frame = data.xs(ticker, axis=1, level=1).dropna(how='all')
+                        frames[ticker] = normalize_history(frame.copy(), interval)
+        errors = {ticker.upper(): str(msg) for ticker, msg in errors.items()}
+        if all(frame is None for frame in frames.values()) and any(
+                is_throttle_error(RuntimeError(msg)) for msg in errors.values()):
+            # Lote inteiro recusado por limite de pedidos: o FetchEngine repete-o com backoff
+            raise RuntimeError(next(msg for msg in errors.values() if is_throttle_error(RuntimeError(msg))))
+        return frames, errors
+
+    def last_prices(self, tickers):
+        """Um pedido de barras de 1 minuto do dia; os tickers sem negociação hoje usam o último fecho diário."""
+        prices = self._last_prices(tickers, period="1d", interval="1m")
+        missing = [t for t in tickers if prices.get(t) is None]
+        if missing:
+            prices.update(self._last_prices(missing, period="5d", interval="1d"))
+        return prices
+
+    def _last_prices(self, tickers, period, interval):
+        data = _yf_download(tickers, period=period, interval=interval, group_by='column', threads=True)
+        if not isinstance(data, pd.DataFrame) or data.empty or 'Close' not in data.columns.get_level_values(0):
+            return {}
+        close = data['Close']
+        if isinstance(close, pd.Series):
+            close = close.to_frame(tickers[0])
+        prices = {}
+        for ticker in tickers:
+            if ticker not in close.columns:
+                continue
+            series = close[ticker].dropna()
+            if not series.empty:
+                prices[ticker] = float(series.iloc[-1])
+        return prices
+
+
+class FileReplaySource(DataSource):
+    """
+    Fonte offline que serve snapshots locais, para medições de desempenho sem rede.
+    Procura <root>/<interval>/<TICKER>.{parquet,csv,pkl} e, em alternativa, <root>/<TICKER>.{...}
+    (o mesmo formato do OHLCVStore, que pode ser usado directamente como snapshot).
+    Os CSV devem ter a coluna de datas como primeira coluna.
+    As cotações vêm de <root>/quotes.csv (colunas ticker, price) se existir; senão é usado
+    o último 'Close' disponível até `as_of`.
+    `as_of` fixa o "agora" da fonte: as janelas por período e a frescura são calculadas
+    relativamente a essa data, o que torna as execuções reprodutíveis.
+    """
+    name = "file_replay"
+    persistent = False
+    EXTENSIONS = (".parquet", ".csv", ".pkl")
+
+    def __init__(self, root, as_of=None):
+        self.root = root
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else None
+        self._frames = {}
+        self._quotes = None
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self.as_of if self.as_of is not None else pd.Timestamp.now()
+
+    def _find(self, ticker, interval):
+        for folder in (os.path.join(self.root, interval), self.root):
+            for ext in self.EXTENSIONS:
+                path = os.path.join(folder, f"{ticker}{ext}")
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def _read(self, ticker, interval):
+        key = (ticker, interval)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        path = self._find(ticker, interval)
+        data = None
+        if path is not None:
+            if path.endswith(".parquet"):
+                data = pd.read_parquet(path)
+            elif path.endswith(".csv"):
+                data = pd.read_csv(path, index_col=0, parse_dates=True)
+            else:
+                data = pd.read_pickle(path)
+            data = normalize_history(data, interval)
+            if data is not None and self.as_of is not None:
+                data = data[data.index <= self.as_of]
+        with self._lock:
+            self._frames[key] = data
+        return data
+
+    def history(self, ticker, interval, start=None, end=None, period=None):
+        data = self._read(ticker, interval)
+        if data is None or data.empty:
+            return None
+        if start is None:
+            start = period_start(period, self.now())
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        if end is not None:
+            data = data[data.index < pd.Timestamp(end)]
+        return data.copy() if not data.empty else None
+
+    def last_prices(self, tickers):
+        if self._quotes is None:
+            path = os.path.join(self.root, "quotes.csv")
+            quotes = {}
+            if os.path.isfile(path):
+                df = pd.read_csv(path)
+                quotes = {str(t).upper(): float(p) for t, p in zip(df["ticker"], df["price"])}
+            self._quotes = quotes
+        prices = {}
+        for ticker in tickers:
+            if ticker in self._quotes:
+                prices[ticker] = self._quotes[ticker]
+                continue
+            data = self._read(ticker, '1d')
+            if data is not None and not data.empty:
+                prices[ticker] = float(data['Close'].iloc[-1])
+        return prices
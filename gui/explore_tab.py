@@ -28,13 +28,20 @@ class SuggestionWorker(QThread):
     def run(self):
         total = len(self.tickers)
         linhas_cache = []
+        # Obtém o histórico e os preços do universo de uma vez; o ciclo abaixo lê da cache
+        precos_atuais = {}
+        try:
+            self.data_provider.get_historical_data_many(self.tickers)
+            precos_atuais = self.data_provider.get_current_prices(self.tickers)
+        except Exception as err:
+            print(f"[ERRO SUGESTÃO] download em lote: {err}")
         for i, ticker in enumerate(self.tickers):
             res = {"Ticker": ticker}
             try:
                 data = self.data_provider.get_historical_data(ticker)
                 # Preço atual:
                 try:
-                    preco_atual = float(self.data_provider.get_current_price(ticker))
+                    preco_atual = float(precos_atuais.get(ticker.upper()))
                 except Exception:
                     preco_atual = float('nan')
                 res["PrecoAtual"] = preco_atual
@@ -349,6 +356,11 @@ class ExploreTab(QWidget):
             return
         portfolio_tickers = {pos['ticker'] for pos in self.portfolio_manager.positions}
         tickers_para_analise = [t for t in universe if t not in portfolio_tickers]
+        # Ignora símbolos deslistados/inválidos já conhecidos (cache negativa do DataProvider)
+        validos = self.data_provider.negative_cache.prune(tickers_para_analise)
+        if len(validos) < len(tickers_para_analise):
+            print(f"[INFO] {len(tickers_para_analise) - len(validos)} tickers sem dados ignorados em {universo_nome}")
+        tickers_para_analise = validos
         self.suggestions_table.setRowCount(len(tickers_para_analise))
         self.progress_bar.setMaximum(100)
         self.progress_bar.setValue(0)
@@ -0,0 +1,106 @@
+"""
+OptimizationHeatmapDialog
+-------------------------
+
+Base dos diálogos de optimização com mapa de calor (heatmap) do Sharpe ratio
+numa grelha de dois parâmetros (ver HeatmapOptimizationDialog e
+StopLossTakeProfitDialog).
+
+A subclasse define os valores e as etiquetas de cada eixo (setup_heatmap) e entrega
+os resultados parciais do OptimizationService (start_optimization); a base corre-os
+num OptimizationWorker, preenche o mapa à medida que os lotes terminam e cancela os
+backtests em falta quando o diálogo é fechado.
+"""
+
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QProgressBar
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+import numpy as np
+
+from gui.optimization_worker import OptimizationWorker
+
+# Acima deste número de células o mapa não leva anotações com os valores
+MAX_ANNOTATED_CELLS = 100
+
+
+class OptimizationHeatmapDialog(QDialog):
+    # Parâmetros (chaves de cada ponto da grelha) nas linhas e nas colunas do mapa
+    row_param = None
+    col_param = None
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.worker = None
+        self.results = []
+        QVBoxLayout(self)
+
+    def show_insufficient_data(self):
+        self.layout().addWidget(QLabel("Dados insuficientes para otimização."))
+
+    def setup_heatmap(self, row_vals, col_vals, row_labels, col_labels, xlabel, ylabel, title):
+        """Desenha o mapa (vazio); as células são preenchidas à medida que os lotes terminam."""
+        self.row_vals = list(row_vals)
+        self.col_vals = list(col_vals)
+        self.heatmap = np.full((len(self.row_vals), len(self.col_vals)), np.nan)
+        fig = Figure(figsize=(7, 4))
+        self.canvas = FigureCanvas(fig)
+        self.ax = fig.add_subplot(111)
+        self.im = self.ax.imshow(self.heatmap, cmap='viridis', aspect='auto', origin='lower')
+        self.ax.set_xticks(range(len(self.col_vals)))
+        self.ax.set_yticks(range(len(self.row_vals)))
+        self.ax.set_xticklabels(col_labels)
+        self.ax.set_yticklabels(row_labels)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_title(title)
+        self.texts = []
+        fig.colorbar(self.im, ax=self.ax, label='Sharpe Ratio')
+        self.layout().addWidget(self.canvas)
+        self.progress_bar = QProgressBar()
+        self.layout().addWidget(self.progress_bar)
+
+    def start_optimization(self, service, results, total):
+        """Consome os resultados parciais de `service` (iter_*_grid) numa thread à parte."""
+        self.worker = OptimizationWorker(service, results, total)
+        self.worker.partial.connect(self.on_partial_results)
+        self.worker.progress.connect(self.progress_bar.setValue)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+
+    def on_partial_results(self, results):
+        rows = {v: i for i, v in enumerate(self.row_vals)}
+        cols = {v: j for j, v in enumerate(self.col_vals)}
+        for point, metrics in results:
+            sharpe_val = metrics.get('sharpe') if metrics else None
+            self.heatmap[rows[point[self.row_param]], cols[point[self.col_param]]] = (
+                np.nan if sharpe_val is None else sharpe_val)
+        self.redraw()
+
+    def on_finished(self, results):
+        self.results = results
+        self.progress_bar.setValue(100)
+
+    def redraw(self):
+        self.im.set_data(self.heatmap)
+        if not np.isnan(self.heatmap).all():
+            self.im.set_clim(np.nanmin(self.heatmap), np.nanmax(self.heatmap))
+        # Anotações de valores
+        for text in self.texts:
+            text.remove()
+        self.texts = []
+        if self.heatmap.size <= MAX_ANNOTATED_CELLS:
+            vmax = np.nanmax(self.heatmap) if not np.isnan(self.heatmap).all() else 0
+            for i in range(len(self.row_vals)):
+                for j in range(len(self.col_vals)):
+                    val = self.heatmap[i, j]
+                    if not np.isnan(val):
+                        self.texts.append(self.ax.text(j, i, f"{val:.2f}", ha='center', va='center',
+                                                       color='white' if val < vmax/2 else 'black', fontsize=8))
+        self.canvas.draw_idle()
+
+    def done(self, result):
+        # Ao fechar, cancela os backtests que ainda faltam
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.stop()
+        super().done(result)
@@ -1,10 +1,11 @@
 ﻿def analyse_indicators_custom(data):
     from indicators.ta import sma, rsi, macd, bollinger_bands
+    from indicators.cache import cached_indicator
     close = data['Close']
-    sma20 = sma(close, 20)
-    rsi14 = rsi(close, 14)
-    macd_line, macd_signal = macd(close)
-    bb_sma, bb_upper, bb_lower = bollinger_bands(close)
+    sma20 = cached_indicator(data, "sma", lambda: sma(close, 20), (20,))
+    rsi14 = cached_indicator(data, "rsi", lambda: rsi(close, 14), (14,))
+    macd_line, macd_signal = cached_indicator(data, "macd", lambda: macd(close), (12, 26, 9))
+    bb_sma, bb_upper, bb_lower = cached_indicator(data, "bollinger", lambda: bollinger_bands(close), (20, 2))
     msgs = []
     try:
         if close.iloc[-1] > sma20.iloc[-1]:
@@ -31,6 +31,8 @@ class MainWindow(QMainWindow):
         for t in portfolio_tickers:
             if t not in self.tickers:
                 self.tickers.append(t)
+        # Tabela principal e portefólio ficam sempre na cache de histórico
+        self.data_provider.pin_tickers(self.tickers)
         self.current_ticker = None
         self.current_data = None
 
@@ -53,9 +55,10 @@ class MainWindow(QMainWindow):
         self.stock_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.stock_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.stock_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        prices = self.data_provider.get_current_prices(self.tickers)
         for i, ticker in enumerate(self.tickers):
             self.stock_table.setItem(i, 0, QTableWidgetItem(ticker))
-            price = self.data_provider.get_current_price(ticker)
+            price = prices.get(ticker.upper())
             price_text = f"{price:.2f}" if price is not None else "N/A"
             self.stock_table.setItem(i, 1, QTableWidgetItem(price_text))
         self.stock_table.resizeColumnsToContents()
@@ -209,8 +212,9 @@ class MainWindow(QMainWindow):
     # ---------- (Métodos a partir daqui, todos completos) ----------
 
     def refresh_data(self):
+        prices = self.data_provider.get_current_prices(self.tickers, refresh=True)
         for i, ticker in enumerate(self.tickers):
-            price = self.data_provider.get_current_price(ticker)
+            price = prices.get(ticker.upper())
             price_text = f"{price:.2f}" if price is not None else "N/A"
             self.stock_table.setItem(i, 1, QTableWidgetItem(price_text))
         if self.current_ticker:
@@ -332,6 +336,7 @@ class MainWindow(QMainWindow):
             return
         buy_date = date_edit.date().toString("yyyy-MM-dd")
         self.portfolio_manager.add_position(ticker.strip().upper(), qty, price, buy_date)
+        self.data_provider.pin_tickers([ticker.strip().upper()])
         if ticker.strip().upper() not in self.tickers:
             self.tickers.append(ticker.strip().upper())
             new_row = self.stock_table.rowCount()
@@ -630,32 +635,22 @@ class MainWindow(QMainWindow):
             dlg.exec_()
             # Resumo da melhor combinação short/long
             try:
-                # Calcula heatmap novamente para encontrar melhor Sharpe
-                short_vals = [10, 20, 30, 40, 50]
-                long_vals = [50, 100, 150, 200]
+                # Melhor Sharpe da grelha do diálogo: os resultados já estão na cache de backtests,
+                # pelo que só se calculam pontos que o diálogo não chegou a correr (se foi fechado antes)
+                short_vals = getattr(dlg, 'short_vals', [10, 20, 30, 40, 50])
+                long_vals = getattr(dlg, 'long_vals', [50, 100, 150, 200])
                 best_val = None
                 best_pair = None
-                from backtest.backtester import Backtester
+                from backtest.optimizer import OptimizationService, param_grid
                 from strategies.sma_crossover import SMACrossoverStrategy
-                from backtest.metrics import calculate_metrics
-                backtester = Backtester(initial_capital=self.initial_capital)
-                for sw in short_vals:
-                    for lw in long_vals:
-                        if sw >= lw:
-                            continue
-                        try:
-                            strategy = SMACrossoverStrategy(short_window=sw, long_window=lw)
-                            signals = strategy.generate_signals(self.current_data)
-                            results = backtester.run(self.current_data, signals)
-                            eq = results['equity_curve']
-                            tr = results.get('trades')
-                            metrics = calculate_metrics(self.current_data, signals, eq, tr)
-                            sharpe = float(metrics.get('sharpe', '0'))
-                            if best_val is None or sharpe > best_val:
-                                best_val = sharpe
-                                best_pair = (sw, lw)
-                        except Exception:
-                            continue
+                points = param_grid({"short_window": short_vals, "long_window": long_vals},
+                                    lambda p: p["short_window"] < p["long_window"])
+                results = OptimizationService().optimize_strategy(self.current_data, SMACrossoverStrategy, points,
+                                                                  self.initial_capital)
+                sharpe = results.set_index(["short_window", "long_window"])["sharpe"].dropna()
+                if not sharpe.empty:
+                    best_pair = sharpe.idxmax()
+                    best_val = float(sharpe[best_pair])
                 if best_pair:
                     summary = (f"<b>Mapa Parâmetros:</b> Melhor Sharpe {best_val:.2f} com short={best_pair[0]} e long={best_pair[1]}")
                     self.indicator_analysis_text.append(summary)
@@ -799,27 +794,23 @@ class MainWindow(QMainWindow):
             if StopLossTakeProfitDialog is None:
                 QMessageBox.critical(self, "Mapa Stop/Take", "O módulo de otimização Stop/Take não está disponível.")
                 return
-            dlg = StopLossTakeProfitDialog(self.current_data, signals, self.initial_capital, self)
+            dlg = StopLossTakeProfitDialog(self.current_data, signals, self.initial_capital, self,
+                                           strategy=self.strategy)
             dlg.exec_()
-            # Resumo da melhor combinação stop/take
+            # Resumo da melhor combinação stop/take (consulta à cache de backtests preenchida pelo diálogo)
             try:
-                stop_vals = [-0.02, -0.03, -0.05, -0.1]
-                take_vals = [0.02, 0.04, 0.06, 0.1]
+                stop_vals = getattr(dlg, 'stop_vals', [-0.02, -0.03, -0.05, -0.1])
+                take_vals = getattr(dlg, 'take_vals', [0.02, 0.04, 0.06, 0.1])
                 best_val = None
                 best_pair = None
-                from stop_loss_take_profit_dialog import simulate_with_sl_tp
-                from backtest.metrics import calculate_metrics
-                for sl in stop_vals:
-                    for tp in take_vals:
-                        try:
-                            eq, tr = simulate_with_sl_tp(self.current_data, signals, sl, tp, self.initial_capital)
-                            metrics = calculate_metrics(self.current_data, signals, eq, tr)
-                            sharpe = float(metrics.get('sharpe', '0'))
-                            if best_val is None or sharpe > best_val:
-                                best_val = sharpe
-                                best_pair = (sl, tp)
-                        except Exception:
-                            continue
+                from backtest.optimizer import OptimizationService, param_grid
+                points = param_grid({"stop_loss": stop_vals, "take_profit": take_vals})
+                results = OptimizationService().optimize_sl_tp(self.current_data, signals, points,
+                                                               self.initial_capital, strategy=self.strategy)
+                sharpe = results.set_index(["stop_loss", "take_profit"])["sharpe"].dropna()
+                if not sharpe.empty:
+                    best_pair = sharpe.idxmax()
+                    best_val = float(sharpe[best_pair])
                 if best_pair:
                     summary = (f"<b>Stop/Take:</b> Melhor Sharpe {best_val:.2f} com stop={best_pair[0]*100:.0f}% e take={best_pair[1]*100:.0f}%")
                     self.indicator_analysis_text.append(summary)
@@ -0,0 +1,47 @@
+"""
+OptimizationWorker
+------------------
+
+Thread Qt que consome os resultados parciais de um OptimizationService
+(backtest/optimizer.py) fora da thread da interface e os entrega por sinais,
+para que os mapas de calor sejam desenhados à medida que os lotes terminam.
+
+Uso típico:
+    service = OptimizationService()
+    worker = OptimizationWorker(service, service.iter_strategy_grid(data, Estrategia, pontos), len(pontos))
+    worker.partial.connect(actualiza_mapa)
+    worker.start()
+"""
+
+import logging
+from PyQt5.QtCore import QThread, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class OptimizationWorker(QThread):
+    partial = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(list)
+
+    def __init__(self, service, results, total):
+        super().__init__()
+        self.service = service
+        self.results = results
+        self.total = total
+
+    def run(self):
+        all_results = []
+        try:
+            for part in self.results:
+                all_results.extend(part)
+                self.partial.emit(part)
+                self.progress.emit(int(len(all_results) / self.total * 100) if self.total else 100)
+        except Exception as e:
+            logger.error(f"Erro na optimização: {e}")
+        self.finished.emit(all_results)
+
+    def stop(self):
+        """Cancela os lotes que ainda não começaram e espera pelo fim da thread."""
+        self.service.cancel()
+        self.wait()
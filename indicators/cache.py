@@ -0,0 +1,220 @@
+"""
+Cache de indicadores e features endereçada pelo conteúdo dos dados.
+
+A chave de cada entrada é (ticker, intervalo, impressão digital das barras, nome, parâmetros).
+A impressão digital combina o número de barras, a primeira barra e um hash das últimas
+`tail_bars` barras: uma nova barra, uma barra revista ou um ajuste do histórico
+(dividendos/splits alteram a primeira barra) dão uma chave nova, e dados iguais
+reutilizam o resultado mesmo que venham de DataFrames diferentes.
+
+O ticker e o intervalo vêm de data.attrs (preenchidos pelo DataProvider); quando não
+existem, a impressão digital por si só identifica os dados.
+
+Os resultados ficam numa FrameLRUCache limitada em bytes e, opcionalmente, em disco
+(um ficheiro pickle por chave em `disk_dir`), para sobreviverem entre execuções.
+Cada leitura devolve uma cópia, para que quem a recebe a possa alterar à vontade.
+
+Para o frame de features guarda-se também, por (ticker, intervalo), o estado do último
+cálculo: quando chega uma barra nova só a cauda é recalculada (compute_features_incremental).
+O DataProvider regista a série completa do armazém (register_history) antes de recortar a
+janela pedida; as features de uma janela dessa série são calculadas sobre a série completa
+e depois recortadas, pelo que o início da janela pode avançar (period='1y') sem perder o
+reaproveitamento do cálculo anterior.
+"""
+
+import os
+import pickle
+import hashlib
+import threading
+import logging
+import pandas as pd
+
+from data.memory_cache import FrameLRUCache
+from data.dtypes import compact_features
+from indicators.graph import compute_features_incremental, common_prefix
+from indicators.timeframes import multi_timeframe_features
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDICATOR_CACHE_BYTES = 128 * 1024 ** 2
+DEFAULT_FEATURE_STATE_BYTES = 128 * 1024 ** 2
+DEFAULT_TAIL_BARS = 256
+
+
+def data_fingerprint(data, tail_bars=DEFAULT_TAIL_BARS):
+    """Hash do conteúdo de um DataFrame/Series OHLCV (nº de barras, primeira barra e últimas tail_bars)."""
+    if data is None or len(data) == 0:
+        return "vazio"
+    digest = hashlib.sha1(f"{len(data)}|{getattr(data, 'columns', getattr(data, 'name', ''))!s}".encode())
+    for part in (data.iloc[:1], data.iloc[-tail_bars:]):
+        digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def window_position(history, data):
+    """Posição de `data` dentro de `history` (mesmas datas e valores OHLCV), ou None se não for uma janela dela."""
+    if history is None or data is None or len(data) == 0:
+        return None
+    start = history.index.searchsorted(data.index[0])
+    window = history.iloc[start:start + len(data)]
+    if not window.index.equals(data.index) or common_prefix(window, data) < len(data):
+        return None
+    return start
+
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, (tuple, list)):
+        return type(value)(_copy(v) for v in value)
+    return value
+
+
+class IndicatorCache:
+    """
+    Cache de resultados de indicadores (Series, tuplos de Series, DataFrames de features).
+    Uso: cache.get_or_compute(data, "rsi", lambda: rsi(data['Close'], 14), params=(14,))
+    """
+    def __init__(self, max_bytes=DEFAULT_INDICATOR_CACHE_BYTES, disk_dir=None, tail_bars=DEFAULT_TAIL_BARS,
+                 state_max_bytes=DEFAULT_FEATURE_STATE_BYTES, compact=False):
+        self.memory = FrameLRUCache(max_bytes, label="Cache de indicadores")
+        self.feature_states = FrameLRUCache(state_max_bytes, label="Estado das features incrementais")
+        self.histories = FrameLRUCache(state_max_bytes, label="Séries completas das features")
+        self.disk_dir = disk_dir
+        self.tail_bars = tail_bars
+        # Modo compacto (opcional): frames de features em float32
+        self.compact = compact
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, data, name, params=()):
+        attrs = getattr(data, "attrs", {}) or {}
+        return (attrs.get("ticker"), attrs.get("interval"), data_fingerprint(data, self.tail_bars),
+                name, repr(params))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+    def _load_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ficheiro da cache de indicadores inválido ({path}): {e}")
+            return None
+
+    def _save_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar a cache de indicadores em {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_or_compute(self, data, name, func, params=()):
+        """Devolve (uma cópia de) o resultado guardado para estes dados/parâmetros, ou calcula func()."""
+        key = self.make_key(data, name, params)
+        value = self.memory.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return _copy(value)
+        value = self._load_disk(key)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            with self._lock:
+                self.misses += 1
+            value = func()
+            self._save_disk(key, value)
+        self.memory[key] = value
+        return _copy(value)
+
+    def register_history(self, data):
+        """
+        Regista a série completa (não recortada) de data.attrs ticker/intervalo.
+        As janelas pedidas a features que sejam recortes dela passam a ser calculadas sobre ela.
+        """
+        attrs = getattr(data, "attrs", {}) or {}
+        if attrs.get("ticker") and data is not None and not data.empty:
+            self.histories[(attrs["ticker"], attrs.get("interval"))] = data
+
+    def features(self, data, multi_timeframe=False):
+        """
+        Frame de features (sem linhas com NaN); numa falha recalcula só as barras novas da série.
+        Com multi_timeframe=True junta as features semanais/mensais (ver indicators/timeframes.py).
+        Se `data` for uma janela da série registada com register_history, as features são
+        calculadas sobre a série completa e recortadas às datas de `data`.
+        """
+        attrs = getattr(data, "attrs", {}) or {}
+        series_key = (attrs.get("ticker"), attrs.get("interval")) if attrs.get("ticker") else None
+        history = self.histories.get(series_key) if series_key else None
+        start = window_position(history, data)
+        base = data if start is None else history
+
+        def compute():
+            state = self.feature_states.get(series_key) if series_key else None
+            features, state = compute_features_incremental(base, state)
+            if series_key:
+                self.feature_states[series_key] = state
+            if multi_timeframe:
+                features = features.join(multi_timeframe_features(base))
+            if base is not data:
+                features = features.iloc[start:start + len(data)]
+            features = features.dropna()
+            return compact_features(features) if self.compact else features
+        params = tuple(flag for flag, on in (("compact", self.compact), ("multi_timeframe", multi_timeframe)) if on)
+        if base is not data:
+            # O aquecimento dos indicadores depende do início da série completa
+            params += (("history_from", str(base.index[0])),)
+        return self.get_or_compute(data, "features", compute, params=params)
+
+    def clear(self):
+        self.memory.clear()
+        self.feature_states.clear()
+        self.histories.clear()
+        with self._lock:
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+        stats.update(self.memory.stats())
+        return stats
+
+
+# Cache partilhada pela IA, pelas estratégias e pela análise de indicadores
+indicator_cache = IndicatorCache()
+
+
+def cached_indicator(data, name, func, params=()):
+    """Atalho para indicator_cache.get_or_compute."""
+    return indicator_cache.get_or_compute(data, name, func, params)
+
+
+def cached_features(data, multi_timeframe=False):
+    """DataFrame de features (compute_all_indicators sem linhas com NaN), através da cache."""
+    return indicator_cache.features(data, multi_timeframe)
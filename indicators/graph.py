@@ -0,0 +1,232 @@
+"""
+Grafo de dependências dos indicadores usados por compute_all_indicators.
+
+Cada nó é um resultado intermédio ou final (EMA12/26, desvio-padrão de 20 períodos,
+True Range, preço típico, ...) declarado com as suas dependências. O IndicatorGraph
+calcula cada nó uma única vez por DataFrame e partilha-o entre os indicadores que
+dele dependem (ex.: o True Range serve o ATR e o ADX; o preço típico serve o CCI e o MFI).
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators import ta
+
+# Colunas OHLCV que servem de nós de origem
+SOURCE_COLUMNS = {
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "volume": "Volume",
+}
+
+# nome do nó -> (dependências, função que recebe os valores das dependências)
+NODES = {
+    "close_diff": (("close",), lambda close: close.diff()),
+    "std20": (("close",), lambda close: ta.rolling_std(close, 20)),
+    "true_range": (("high", "low", "close"), ta.true_range),
+    "typical_price": (("high", "low", "close"), ta.typical_price),
+    "ema12": (("close",), lambda close: ta.ema(close, 12)),
+    "ema26": (("close",), lambda close: ta.ema(close, 26)),
+    "macd": (("ema12", "ema26"), lambda fast, slow: fast - slow),
+    "macd_signal": (("macd",), lambda line: ta.ema(line, 9)),
+    "bb_upper": (("sma20", "std20"), lambda sma_, std: sma_ + 2 * std),
+    "bb_lower": (("sma20", "std20"), lambda sma_, std: sma_ - 2 * std),
+    "rsi14": (("close_diff",), lambda delta: ta.rsi_from_delta(delta, 14)),
+    "atr": (("true_range",), lambda tr: tr.rolling(window=14, min_periods=1).mean()),
+    "adx": (("high", "low", "atr"), lambda high, low, atr_: ta.adx_from_atr(high, low, atr_, 14)),
+    "cci": (("typical_price",), lambda tp: ta.cci_from_tp(tp, 20)),
+    "stoch_k": (("close", "low", "high"), lambda close, low, high: ta.stochastic_k(close, low, high, 14)),
+    "obv": (("close_diff", "volume"), ta.obv_from_delta),
+    "mfi": (("typical_price", "volume"), lambda tp, volume: ta.mfi_from_tp(tp, volume, 14)),
+    # Fora do conjunto por omissão (FEATURES); disponíveis com compute(names=...) e nos painéis
+    "highest_high22": (("high",), lambda high: ta.rolling_max(high, 22)),
+    "lowest_low22": (("low",), lambda low: ta.rolling_min(low, 22)),
+    "atr22": (("true_range",), lambda tr: tr.rolling(window=22, min_periods=1).mean()),
+    "chandelier_long": (("highest_high22", "atr22"), lambda hh, atr_: hh - 3 * atr_),
+    "chandelier_short": (("lowest_low22", "atr22"), lambda ll, atr_: ll + 3 * atr_),
+    "donchian_upper": (("high",), lambda high: ta.rolling_max(high, 20)),
+    "donchian_lower": (("low",), lambda low: ta.rolling_min(low, 20)),
+    "williams_r": (("high", "low", "close"), lambda high, low, close: ta.williams_r(high, low, close, 14)),
+    "bullish_engulfing": (("open", "close"), ta.is_bullish_engulfing),
+    "bearish_engulfing": (("open", "close"), ta.is_bearish_engulfing),
+}
+for _w in (10, 20, 50, 200):
+    NODES[f"sma{_w}"] = (("close",), lambda close, w=_w: ta.sma(close, w))
+    NODES[f"ema{_w}"] = (("close",), lambda close, w=_w: ta.ema(close, w))
+for _w in (20, 50, 200):
+    NODES[f"avg_vol{_w}"] = (("volume",), lambda volume, w=_w: ta.average_volume(volume, w))
+
+# Barras anteriores de que cada nó precisa, além das que as dependências já exigem
+# (uma janela móvel de w barras precisa de w - 1 barras anteriores; um diff/shift de 1).
+LOOKBACKS = {
+    "close_diff": 1, "std20": 19, "true_range": 1, "typical_price": 0,
+    "macd": 0, "bb_upper": 0, "bb_lower": 0,
+    "rsi14": 13, "atr": 13,
+    "adx": 27,  # diff + soma móvel de 14 + média móvel de 14 do DX
+    "cci": 19, "stoch_k": 13,
+    "mfi": 14,  # shift do preço típico + soma móvel de 14
+    "bullish_engulfing": 1, "bearish_engulfing": 1,
+    "highest_high22": 21, "lowest_low22": 21, "atr22": 21,
+    "chandelier_long": 0, "chandelier_short": 0,
+    "donchian_upper": 19, "donchian_lower": 19, "williams_r": 13,
+}
+for _w in (10, 20, 50, 200):
+    LOOKBACKS[f"sma{_w}"] = _w - 1
+for _w in (20, 50, 200):
+    LOOKBACKS[f"avg_vol{_w}"] = _w - 1
+
+
+def _continue_ema(seed, series, span):
+    """Continua uma EMA (adjust=False) a partir do último valor conhecido."""
+    values = ta.ema(pd.Series(np.r_[seed, series.to_numpy(dtype=float)]), span).to_numpy()[1:]
+    return pd.Series(values, index=series.index)
+
+
+def _continue_cumsum(seed, series):
+    """Continua uma soma acumulada a partir do último valor conhecido."""
+    values = pd.Series(np.r_[seed, series.to_numpy(dtype=float)]).cumsum().to_numpy()[1:]
+    return pd.Series(values, index=series.index)
+
+
+# Nós recursivos (dependem de toda a história): em vez de uma janela, continuam a partir do
+# último valor já calculado. Recebem (valor anterior, *dependências nas barras novas).
+CONTINUATIONS = {
+    "ema12": lambda seed, close: _continue_ema(seed, close, 12),
+    "ema26": lambda seed, close: _continue_ema(seed, close, 26),
+    "macd_signal": lambda seed, line: _continue_ema(seed, line, 9),
+    "obv": lambda seed, delta, volume: _continue_cumsum(seed, np.sign(delta).fillna(0) * volume),
+}
+for _w in (10, 20, 50, 200):
+    CONTINUATIONS[f"ema{_w}"] = lambda seed, close, w=_w: _continue_ema(seed, close, w)
+
+
+def total_lookback(name, nodes=None):
+    """Barras anteriores necessárias para recalcular exactamente o nó `name` numa barra."""
+    nodes = nodes if nodes is not None else NODES
+    if name in SOURCE_COLUMNS:
+        return 0
+    deps = nodes[name][0]
+    own = 0 if name in CONTINUATIONS else LOOKBACKS[name]
+    return own + max((total_lookback(dep, nodes) for dep in deps), default=0)
+
+
+# Features devolvidas por compute_all_indicators, pela ordem do dicionário
+FEATURES = [
+    "sma10", "sma20", "sma50", "sma200",
+    "ema10", "ema20", "ema50", "ema200",
+    "rsi14", "macd", "macd_signal", "bb_upper", "bb_lower",
+    "adx", "cci", "atr", "stoch_k", "obv", "mfi",
+    "avg_vol20", "avg_vol50", "avg_vol200",
+    "bullish_engulfing", "bearish_engulfing",
+]
+
+
+class IndicatorGraph:
+    """
+    Avaliação preguiçosa e memoizada do grafo de indicadores sobre um DataFrame OHLCV.
+    `graph.get("adx")` calcula (uma vez) o ADX e todas as suas dependências;
+    pedidos seguintes de nós já calculados são devolvidos da memória.
+    Com `known` (DataFrame com os valores já calculados dos nós recursivos para as primeiras
+    len(known) barras de `data`), os nós de CONTINUATIONS reutilizam esses valores e só
+    continuam a recursão nas barras seguintes.
+    """
+    def __init__(self, data, nodes=None, known=None):
+        self.data = data
+        self.nodes = nodes if nodes is not None else NODES
+        self.known = known
+        self.values = {}
+
+    def get(self, name):
+        if name in self.values:
+            return self.values[name]
+        if name in SOURCE_COLUMNS:
+            value = self.data[SOURCE_COLUMNS[name]]
+        else:
+            deps, func = self.nodes[name]
+            args = [self.get(dep) for dep in deps]
+            if self.known is not None and name in CONTINUATIONS and name in self.known:
+                head = self.known[name]
+                tail = CONTINUATIONS[name](head.iloc[-1], *(arg.iloc[len(head):] for arg in args))
+                value = pd.concat([head, tail])
+            else:
+                value = func(*args)
+        self.values[name] = value
+        return value
+
+    def compute(self, names=None):
+        """Devolve {nome: série} para os nós pedidos (por omissão, todas as FEATURES)."""
+        return {name: self.get(name) for name in (names or FEATURES)}
+
+
+def common_prefix(previous, data):
+    """Número de barras iniciais iguais (datas e valores OHLCV) entre duas séries."""
+    n = min(len(previous), len(data))
+    columns = [c for c in SOURCE_COLUMNS.values() if c in previous.columns and c in data.columns]
+    if n == 0:
+        return 0
+    same = previous.index[:n] == data.index[:n]
+    a = previous[columns].to_numpy(dtype=float)[:n]
+    b = data[columns].to_numpy(dtype=float)[:n]
+    same &= ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+    return n if same.all() else int(np.argmin(same))
+
+
+def continuation_prefix(prefix, previous, values):
+    """
+    Recua `prefix` até à última barra a partir da qual os nós recursivos continuam exactamente.
+    Nessa barra os valores guardados de CONTINUATIONS e as colunas OHLCV de que dependem
+    directamente têm de ser finitos: depois de um fecho NaN o ewm (adjust=False) do pandas
+    ainda tem o peso anterior a decair, e um OBV NaN faria a soma acumulada recomeçar do zero.
+    """
+    nodes = [name for name in CONTINUATIONS if name in values.columns]
+    columns = list(dict.fromkeys(SOURCE_COLUMNS[dep] for name in nodes for dep in NODES[name][0]
+                                 if dep in SOURCE_COLUMNS and SOURCE_COLUMNS[dep] in previous.columns))
+    finite = np.isfinite(values[nodes].to_numpy(dtype=float)[:prefix]).all(axis=1)
+    finite &= np.isfinite(previous[columns].to_numpy(dtype=float)[:prefix]).all(axis=1)
+    rows = np.flatnonzero(finite)
+    return int(rows[-1]) + 1 if rows.size else 0
+
+
+def compute_features_incremental(data, state=None, names=None):
+    """
+    Frame de features (sem dropna) de `data`, reaproveitando o cálculo anterior.
+    state é o segundo valor devolvido pela chamada anterior para a mesma série (ou None).
+    Só as barras novas ou revistas são recalculadas: os indicadores de janela sobre as
+    últimas total_lookback barras (o lookback declarado de cada um), os recursivos (EMA,
+    sinal do MACD, OBV) a partir do último valor guardado numa barra sem NaN (ver
+    continuation_prefix). O resultado coincide com pd.DataFrame(compute_all_indicators(data))
+    a menos de arredondamentos das janelas móveis.
+    O reaproveitamento exige que as barras iniciais sejam as mesmas: uma série cujo início
+    avança tem common_prefix 0 e é recalculada por inteiro. Para as janelas deslizantes do
+    DataProvider (period='1y') a IndicatorCache calcula sobre a série completa do armazém,
+    cujo início é fixo, e recorta a janela depois (ver IndicatorCache.features).
+    Devolve (features, state).
+    """
+    names = list(names or FEATURES)
+    stored = list(dict.fromkeys(names + [n for n in CONTINUATIONS if n in NODES]))
+    prefix = 0
+    if state is not None:
+        previous, values = state
+        if list(values.columns) == stored:
+            prefix = common_prefix(previous, data)
+            prefix = continuation_prefix(prefix, previous, values)
+    lookback = max(total_lookback(name) for name in stored)
+    start = prefix - lookback
+    if start <= 0:
+        values = _to_frame(IndicatorGraph(data).compute(stored), data.index)
+    elif prefix == len(data):
+        values = values.iloc[:prefix]
+    else:
+        graph = IndicatorGraph(data.iloc[start:], known=values.iloc[start:prefix])
+        tail = _to_frame(graph.compute(stored), data.index[start:]).iloc[prefix - start:]
+        values = pd.concat([values.iloc[:prefix], tail])
+    # Cópia das colunas OHLCV: alterações posteriores a `data` não afectam a comparação seguinte
+    ohlcv = data[[c for c in SOURCE_COLUMNS.values() if c in data.columns]].copy()
+    return values[names], (ohlcv, values)
+
+
+def _to_frame(series, index):
+    # Os nós já estão alinhados com `index`: evita o alinhamento de um dicionário de Series
+    return pd.DataFrame({name: values.to_numpy() for name, values in series.items()}, index=index)
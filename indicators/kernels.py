@@ -0,0 +1,87 @@
+"""
+Núcleo de mínimo/máximo móvel em tempo linear, com modo streaming e modo batch.
+
+- Streaming (RollingExtremum): deque monótona; cada barra entra e sai no máximo uma vez,
+  portanto O(1) amortizado por actualização, qualquer que seja a janela.
+- Batch (rolling_min/rolling_max): a mesma ideia de "candidatos" aplicada por blocos
+  de tamanho `window` (van Herk/Gil-Werman): mínimos acumulados dentro de cada bloco
+  da esquerda para a direita e da direita para a esquerda; o extremo de cada janela é
+  o extremo entre o sufixo de um bloco e o prefixo do seguinte. São O(n) operações
+  vectorizadas em numpy, independentemente do tamanho da janela.
+
+Ambos seguem a semântica de rolling(window, min_periods=1).min()/.max(): os NaN são
+ignorados e uma janela só com NaN dá NaN. Aceitam Series ou DataFrames (uma coluna por ticker).
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float("nan")
+
+
+class RollingExtremum:
+    """Mínimo ou máximo móvel com deque monótona (O(1) amortizado por barra)."""
+    def __init__(self, window, mode="min"):
+        self.window = window
+        self._better = (lambda a, b: a <= b) if mode == "min" else (lambda a, b: a >= b)
+        self._deque = deque()
+        self._index = -1
+
+    def update(self, value):
+        self._index += 1
+        value = float(value)
+        if not math.isnan(value):
+            while self._deque and self._better(value, self._deque[-1][1]):
+                self._deque.pop()
+            self._deque.append((self._index, value))
+        while self._deque and self._deque[0][0] <= self._index - self.window:
+            self._deque.popleft()
+        return self.value
+
+    @property
+    def value(self):
+        return self._deque[0][1] if self._deque else NAN
+
+
+def _rolling_extremum(values, window, ufunc):
+    """Extremo móvel ao longo do eixo 0 de um array 2-D (ufunc = np.fmin ou np.fmax)."""
+    n, k = values.shape
+    out = np.empty((n, k))
+    if n == 0:
+        return out
+    head = min(window - 1, n)
+    # Janelas incompletas do início (min_periods=1): extremo acumulado desde a primeira barra
+    out[:head] = ufunc.accumulate(values[:head], axis=0)
+    if n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.full((blocks * window, k), np.nan)
+    padded[:n] = values
+    shaped = padded.reshape(blocks, window, k)
+    prefix = ufunc.accumulate(shaped, axis=1).reshape(-1, k)
+    suffix = ufunc.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(-1, k)
+    # Janela [i - window + 1, i]: sufixo do bloco onde começa + prefixo do bloco onde acaba
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def _apply(series, window, ufunc):
+    values = np.asarray(series, dtype=float)
+    matrix = values if values.ndim == 2 else values[:, None]
+    result = _rolling_extremum(matrix, window, ufunc)
+    if isinstance(series, pd.DataFrame):
+        return pd.DataFrame(result, index=series.index, columns=series.columns)
+    return pd.Series(result[:, 0], index=series.index, name=series.name)
+
+
+def rolling_min(series, window):
+    """Mínimo móvel (igual a series.rolling(window, min_periods=1).min())."""
+    return _apply(series, window, np.fmin)
+
+
+def rolling_max(series, window):
+    """Máximo móvel (igual a series.rolling(window, min_periods=1).max())."""
+    return _apply(series, window, np.fmax)
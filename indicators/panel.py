@@ -0,0 +1,147 @@
+"""
+Cálculo de indicadores em painel (datas × tickers).
+
+Em vez de calcular os indicadores ticker a ticker (um DataFrame OHLCV de cada vez),
+os dados de todo o universo são alinhados em matrizes datas × tickers — uma por
+coluna OHLCV — e cada indicador é calculado uma só vez sobre a matriz inteira,
+com as mesmas funções e o mesmo grafo de dependências de compute_all_indicators.
+
+As datas do painel são a união das datas de todos os tickers; um ticker sem barra
+numa data fica com NaN nessa linha. As falhas no início e no fim de cada série não
+alteram os indicadores, mas as do meio (feriados de outra bolsa, dias sem negociação)
+seriam contadas pelas janelas móveis, shifts e EMAs. Por isso, quando algum ticker tem
+falhas a meio, os cálculos correm sobre as barras de cada ticker encostadas umas às
+outras (RowLayout) e os resultados voltam depois às datas do painel, com NaN (ou 0 nos
+indicadores inteiros, como os padrões de velas) nas datas em que o ticker não tem barra.
+Um ticker conta como tendo barra numa data quando alguma coluna OHLCV não é NaN.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators import ta
+from indicators.graph import IndicatorGraph, NODES, FEATURES, SOURCE_COLUMNS
+
+
+def _before_start(tp, volume):
+    """Datas anteriores à primeira barra de cada ticker (sem preço típico nem volume até aí)."""
+    return ~(tp.notna() | volume.notna()).cummax().astype(bool)
+
+
+# No painel, as datas antes da primeira barra de um ticker não entram nas somas do MFI
+# (numa série isolada essas datas não existem); o resto do grafo é o de compute_all_indicators
+PANEL_NODES = dict(NODES)
+PANEL_NODES["mfi"] = (("typical_price", "volume"),
+                      lambda tp, volume: ta.mfi_from_tp(tp, volume, 14, skip=_before_start(tp, volume)))
+
+
+def to_panel(frames):
+    """
+    Converte {ticker: DataFrame OHLCV} em {coluna: DataFrame datas × tickers}
+    ('Open', 'High', 'Low', 'Close', 'Volume').
+    Aceita também um DataFrame com colunas MultiIndex (coluna, ticker), como o do yf.download.
+    """
+    if isinstance(frames, pd.DataFrame):
+        return {col: frames[col] for col in SOURCE_COLUMNS.values() if col in frames.columns.get_level_values(0)}
+    frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return {}
+    # Um único alinhamento de datas para todos os tickers e colunas
+    wide = pd.concat(frames, axis=1, names=["ticker", "field"]).sort_index()
+    fields = wide.columns.get_level_values("field")
+    panel = {}
+    for col in SOURCE_COLUMNS.values():
+        if col in fields:
+            # Um único bloco 2-D por coluna: as operações seguintes são vectorizadas sobre toda a matriz
+            field = wide.xs(col, axis=1, level="field")
+            panel[col] = pd.DataFrame(field.to_numpy(dtype=float), index=field.index, columns=field.columns)
+    return panel
+
+
+class RowLayout:
+    """
+    Posição de cada barra de cada ticker num painel "compacto", em que as barras de cada
+    ticker ficam seguidas, encostadas ao fim (as séries mais curtas começam com NaN, como
+    as que começam mais tarde no painel original).
+    pack leva uma matriz datas × tickers para o painel compacto; unpack faz o inverso.
+    """
+    def __init__(self, present, index, columns):
+        self.index = index
+        self.columns = columns
+        self.rows, self.cols = np.nonzero(present)
+        counts = present.sum(axis=0)
+        self.length = int(counts.max()) if counts.size else 0
+        rank = present.cumsum(axis=0) - 1
+        self.packed_rows = (rank + (self.length - counts))[self.rows, self.cols]
+
+    def pack(self, frame):
+        values = frame.to_numpy(dtype=float)
+        packed = np.full((self.length, values.shape[1]), np.nan)
+        packed[self.packed_rows, self.cols] = values[self.rows, self.cols]
+        return pd.DataFrame(packed, columns=self.columns)
+
+    def unpack(self, frame):
+        values = frame.to_numpy()
+        if np.issubdtype(values.dtype, np.integer) or values.dtype == bool:
+            full = np.zeros((len(self.index), values.shape[1]), dtype=values.dtype)
+        else:
+            full = np.full((len(self.index), values.shape[1]), np.nan)
+        full[self.rows, self.cols] = values[self.packed_rows, self.cols]
+        return pd.DataFrame(full, index=self.index, columns=self.columns)
+
+
+def row_layout(panel):
+    """
+    RowLayout do painel, ou None se nenhum ticker tiver falhas a meio da série
+    (nesse caso o painel pode ser usado tal como está).
+    """
+    frames = list(panel.values())
+    if not frames:
+        return None
+    present = np.zeros(frames[0].shape, dtype=bool)
+    for frame in frames:
+        present |= frame.notna().to_numpy()
+    counts = present.sum(axis=0)
+    first = present.argmax(axis=0)
+    last = len(present) - 1 - present[::-1].argmax(axis=0)
+    if ((counts == 0) | (last - first + 1 == counts)).all():
+        return None
+    return RowLayout(present, frames[0].index, frames[0].columns)
+
+
+def by_ticker_rows(panel, func):
+    """
+    Aplica func(painel) -> {nome: DataFrame datas × tickers} sobre as barras de cada ticker
+    (ver RowLayout) e devolve os resultados nas datas de `panel`.
+    """
+    layout = row_layout(panel)
+    if layout is None:
+        return func(panel)
+    result = func({col: layout.pack(frame) for col, frame in panel.items()})
+    return {name: layout.unpack(values) for name, values in result.items()}
+
+
+def compute_panel_indicators(frames, names=None, as_frame=False):
+    """
+    Calcula os indicadores para vários tickers de uma vez.
+    frames: {ticker: DataFrame OHLCV}, o resultado de to_panel ou um DataFrame MultiIndex (coluna, ticker).
+    names: indicadores a calcular (por omissão, os de compute_all_indicators).
+    Devolve {indicador: DataFrame datas × tickers} ou, com as_frame=True, um único DataFrame
+    com colunas MultiIndex (indicador, ticker).
+    """
+    panel = frames if is_panel(frames) else to_panel(frames)
+    result = by_ticker_rows(panel, lambda packed: IndicatorGraph(packed, nodes=PANEL_NODES).compute(names or FEATURES))
+    if as_frame:
+        return pd.concat(result, axis=1, names=["indicator", "ticker"])
+    return result
+
+
+def panel_ticker_features(result, ticker):
+    """Extrai de um resultado de compute_panel_indicators o DataFrame de features de um ticker."""
+    if isinstance(result, pd.DataFrame):
+        return result.xs(ticker, axis=1, level="ticker")
+    return pd.DataFrame({name: values[ticker] for name, values in result.items()})
+
+
+def is_panel(frames):
+    return isinstance(frames, dict) and bool(frames) and set(frames) <= set(SOURCE_COLUMNS.values())
@@ -0,0 +1,162 @@
+"""
+Biblioteca de padrões de velas (candlesticks), vectorizada.
+
+Cada padrão recebe open_, high, low, close como Series (um ticker) ou DataFrames
+datas × tickers (painel, ver indicators.panel.to_panel) e devolve 1 nas barras em que
+o padrão fecha e 0 nas restantes, com a mesma forma dos dados. Nada é calculado
+ticker a ticker: um universo inteiro é avaliado com algumas operações sobre matrizes.
+
+Consulta típica: tickers_with_pattern(frames, "hammer", last_n=5) → que tickers
+desenharam um martelo nas últimas 5 barras (e em que data).
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators.ta import is_bullish_engulfing, is_bearish_engulfing
+from indicators.panel import to_panel, is_panel, by_ticker_rows
+
+# Proporções usadas nas definições (fracções da amplitude high-low ou do corpo)
+DOJI_BODY_RATIO = 0.1
+SHADOW_BODY_MULT = 2.0
+SMALL_SHADOW_RATIO = 0.25
+STAR_BODY_RATIO = 0.3
+LONG_BODY_RATIO = 0.6
+
+
+def _parts(open_, high, low, close):
+    body = (close - open_).abs()
+    candle_range = high - low
+    upper_shadow = high - np.maximum(open_, close)
+    lower_shadow = np.minimum(open_, close) - low
+    return body, candle_range, upper_shadow, lower_shadow
+
+
+def is_doji(open_, high, low, close):
+    """Doji: corpo muito pequeno face à amplitude da vela"""
+    body, candle_range, _, _ = _parts(open_, high, low, close)
+    return ((candle_range > 0) & (body <= DOJI_BODY_RATIO * candle_range)).astype(int)
+
+
+def is_hammer(open_, high, low, close):
+    """Martelo: sombra inferior longa (>= 2× corpo), sombra superior curta, corpo na parte de cima"""
+    body, candle_range, upper_shadow, lower_shadow = _parts(open_, high, low, close)
+    return ((candle_range > 0) & (body > 0) &
+            (lower_shadow >= SHADOW_BODY_MULT * body) &
+            (upper_shadow <= SMALL_SHADOW_RATIO * candle_range)).astype(int)
+
+
+def is_shooting_star(open_, high, low, close):
+    """Estrela cadente: sombra superior longa (>= 2× corpo), sombra inferior curta, corpo na parte de baixo"""
+    body, candle_range, upper_shadow, lower_shadow = _parts(open_, high, low, close)
+    return ((candle_range > 0) & (body > 0) &
+            (upper_shadow >= SHADOW_BODY_MULT * body) &
+            (lower_shadow <= SMALL_SHADOW_RATIO * candle_range)).astype(int)
+
+
+def is_morning_star(open_, high, low, close):
+    """
+    Estrela da manhã (3 velas): vela de baixa longa, vela de corpo pequeno abaixo do
+    fecho anterior e vela de alta que fecha acima do meio do corpo da primeira.
+    """
+    body, candle_range, _, _ = _parts(open_, high, low, close)
+    o1, c1, body1, range1 = open_.shift(2), close.shift(2), body.shift(2), candle_range.shift(2)
+    o2, c2, body2 = open_.shift(1), close.shift(1), body.shift(1)
+    first = (c1 < o1) & (body1 >= LONG_BODY_RATIO * range1)
+    star = (body2 <= STAR_BODY_RATIO * body1) & (np.maximum(o2, c2) < c1)
+    third = (close > open_) & (close > (o1 + c1) / 2)
+    return (first & star & third).astype(int)
+
+
+def is_evening_star(open_, high, low, close):
+    """
+    Estrela da tarde (3 velas): vela de alta longa, vela de corpo pequeno acima do
+    fecho anterior e vela de baixa que fecha abaixo do meio do corpo da primeira.
+    """
+    body, candle_range, _, _ = _parts(open_, high, low, close)
+    o1, c1, body1, range1 = open_.shift(2), close.shift(2), body.shift(2), candle_range.shift(2)
+    o2, c2, body2 = open_.shift(1), close.shift(1), body.shift(1)
+    first = (c1 > o1) & (body1 >= LONG_BODY_RATIO * range1)
+    star = (body2 <= STAR_BODY_RATIO * body1) & (np.minimum(o2, c2) > c1)
+    third = (close < open_) & (close < (o1 + c1) / 2)
+    return (first & star & third).astype(int)
+
+
+def is_three_white_soldiers(open_, high, low, close):
+    """
+    Três soldados brancos: três velas de alta seguidas, cada uma abre dentro do corpo
+    da anterior, fecha acima do fecho anterior e perto do máximo.
+    """
+    _, _, upper_shadow, _ = _parts(open_, high, low, close)
+    body = close - open_
+    soldier = (body > 0) & (upper_shadow <= STAR_BODY_RATIO * body)
+    advance = (close > close.shift(1)) & (open_ > open_.shift(1)) & (open_ < close.shift(1))
+    step = soldier & advance
+    return (step & step.shift(1, fill_value=False) & soldier.shift(2, fill_value=False)).astype(int)
+
+
+def is_three_black_crows(open_, high, low, close):
+    """
+    Três corvos negros: três velas de baixa seguidas, cada uma abre dentro do corpo
+    da anterior, fecha abaixo do fecho anterior e perto do mínimo.
+    """
+    _, _, _, lower_shadow = _parts(open_, high, low, close)
+    body = open_ - close
+    crow = (body > 0) & (lower_shadow <= STAR_BODY_RATIO * body)
+    decline = (close < close.shift(1)) & (open_ < open_.shift(1)) & (open_ > close.shift(1))
+    step = crow & decline
+    return (step & step.shift(1, fill_value=False) & crow.shift(2, fill_value=False)).astype(int)
+
+
+# nome -> função(open_, high, low, close)
+PATTERNS = {
+    "doji": is_doji,
+    "hammer": is_hammer,
+    "shooting_star": is_shooting_star,
+    "bullish_engulfing": lambda open_, high, low, close: is_bullish_engulfing(open_, close),
+    "bearish_engulfing": lambda open_, high, low, close: is_bearish_engulfing(open_, close),
+    "morning_star": is_morning_star,
+    "evening_star": is_evening_star,
+    "three_white_soldiers": is_three_white_soldiers,
+    "three_black_crows": is_three_black_crows,
+}
+
+
+def detect_patterns(frames, names=None):
+    """
+    Avalia padrões de velas sobre um DataFrame OHLCV, {ticker: DataFrame OHLCV} ou um painel.
+    Devolve {padrão: Series/DataFrame de 0/1} (datas × tickers no caso de vários tickers).
+    Num painel, as velas anteriores (shift) são as do próprio ticker, mesmo que ele não
+    tenha barra em todas as datas do painel (ver indicators.panel.by_ticker_rows).
+    """
+    def evaluate(ohlc):
+        args = (ohlc['Open'], ohlc['High'], ohlc['Low'], ohlc['Close'])
+        return {name: PATTERNS[name](*args) for name in (names or PATTERNS)}
+
+    if isinstance(frames, pd.DataFrame) and not isinstance(frames.columns, pd.MultiIndex):
+        return evaluate(frames)
+    return by_ticker_rows(frames if is_panel(frames) else to_panel(frames), evaluate)
+
+
+def tickers_with_pattern(frames, pattern, last_n=1, ticker=None):
+    """
+    Tickers que desenharam `pattern` nalguma das últimas last_n barras do painel.
+    Devolve uma Series ticker -> data da ocorrência mais recente, da mais recente para a mais antiga.
+    Com um só DataFrame OHLCV o ticker é `ticker` ou, por omissão, frames.attrs['ticker']
+    (preenchido pelo DataProvider).
+    """
+    if pattern not in PATTERNS:
+        raise KeyError(f"Padrão desconhecido: {pattern}. Disponíveis: {', '.join(PATTERNS)}")
+    hits = detect_patterns(frames, [pattern])[pattern].iloc[-last_n:]
+    if isinstance(hits, pd.Series):
+        ticker = ticker or frames.attrs.get('ticker')
+        if not ticker:
+            raise ValueError("DataFrame sem attrs['ticker']: indique o ticker (ticker=...)")
+        hits = hits.to_frame(ticker)
+    hits = hits.astype(bool)
+    found = hits.any()
+    if not found.any():
+        return pd.Series(dtype="datetime64[ns]", name=pattern)
+    # Última data com o padrão em cada ticker encontrado
+    last_dates = hits.loc[:, found].apply(lambda col: col[col].index[-1])
+    return last_dates.sort_values(ascending=False).rename(pattern)
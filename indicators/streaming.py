@@ -0,0 +1,392 @@
+"""
+Indicadores em streaming (com estado), actualizados em O(1) por nova barra.
+
+Cada indicador é inicializado com o histórico (seed) e depois recebe uma barra de
+cada vez (update), sem recalcular a série inteira. Os valores coincidem com as
+funções vectorizadas de indicators.ta (mesmas janelas, min_periods e tratamento
+dos primeiros valores e das barras com NaN), a menos de erros de arredondamento de
+vírgula flutuante.
+
+As barras são dicionários (ou linhas de DataFrame) com 'Open', 'High', 'Low',
+'Close' e 'Volume'; cada indicador usa apenas as colunas de que precisa.
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+from indicators.kernels import RollingExtremum
+
+NAN = float("nan")
+
+
+class RollingSum:
+    """
+    Soma móvel de uma janela fixa, que ignora NaN (como pandas.rolling(...).sum()).
+    Usa soma compensada (Kahan) para não acumular erro ao longo de muitas barras.
+    """
+    def __init__(self, window, min_periods=1):
+        self.window = window
+        self.min_periods = min_periods
+        self._values = deque()
+        self._sum = 0.0
+        self._comp = 0.0
+        self.count = 0
+
+    def _add(self, value):
+        y = value - self._comp
+        t = self._sum + y
+        self._comp = (t - self._sum) - y
+        self._sum = t
+
+    def update(self, value):
+        value = NAN if value is None else float(value)
+        self._values.append(value)
+        if not math.isnan(value):
+            self._add(value)
+            self.count += 1
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if not math.isnan(old):
+                self._add(-old)
+                self.count -= 1
+        if self.count == 0:
+            # Janela só com NaN: recomeça do zero para não arrastar resíduos
+            self._sum = self._comp = 0.0
+        return self.sum
+
+    @property
+    def sum(self):
+        return self._sum if self.count >= self.min_periods else NAN
+
+    @property
+    def mean(self):
+        return self._sum / self.count if self.count >= self.min_periods and self.count else NAN
+
+
+class RollingVariance:
+    """Variância móvel amostral (ddof=1) com adição/remoção de Welford, como o pandas."""
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self._n = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+
+    def update(self, value):
+        value = float(value)
+        self._values.append(value)
+        if not math.isnan(value):
+            self._n += 1
+            delta = value - self._mean
+            self._mean += delta / self._n
+            self._ssqdm += (self._n - 1) * delta * delta / self._n
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if not math.isnan(old):
+                self._n -= 1
+                if self._n:
+                    delta = old - self._mean
+                    self._mean -= delta / self._n
+                    self._ssqdm -= (self._n + 1) * delta * delta / self._n
+                else:
+                    self._mean = self._ssqdm = 0.0
+        return self.value
+
+    @property
+    def value(self):
+        if self._n < 2:
+            return NAN
+        return max(self._ssqdm, 0.0) / (self._n - 1)
+
+
+class StreamingIndicator:
+    """Base dos indicadores em streaming: update(barra) -> valor actual; seed(DataFrame) -> self."""
+    value = NAN
+
+    def update(self, bar):
+        raise NotImplementedError("Subclasses devem implementar update()")
+
+    def seed(self, data):
+        """Alimenta o indicador com o histórico (DataFrame OHLCV) e devolve-o, pronto para update()."""
+        for bar in data.to_dict("records"):
+            self.update(bar)
+        return self
+
+
+class StreamingSMA(StreamingIndicator):
+    """SMA em streaming (equivalente a ta.sma)."""
+    def __init__(self, window, column="Close"):
+        self.column = column
+        self._sum = RollingSum(window)
+
+    def update(self, bar):
+        self._sum.update(bar[self.column])
+        self.value = self._sum.mean
+        return self.value
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    EMA em streaming (equivalente a ta.ema, adjust=False).
+    Como o ewm do pandas, guarda também o peso do valor anterior: numa barra NaN o valor
+    mantém-se mas o peso continua a decair, e a barra válida seguinte pesa mais.
+    """
+    def __init__(self, window, column="Close"):
+        self.column = column
+        self.alpha = 2.0 / (window + 1)
+        self._old_wt = 1.0
+
+    def push(self, x):
+        x = float(x)
+        if math.isnan(self.value):
+            if not math.isnan(x):
+                self.value = x
+            return self.value
+        self._old_wt *= 1 - self.alpha
+        if not math.isnan(x):
+            if self.value != x:
+                self.value = (self._old_wt * self.value + self.alpha * x) / (self._old_wt + self.alpha)
+            self._old_wt = 1.0
+        return self.value
+
+    def update(self, bar):
+        return self.push(bar[self.column])
+
+
+class StreamingRSI(StreamingIndicator):
+    """RSI em streaming (equivalente a ta.rsi: médias simples das subidas/descidas)."""
+    def __init__(self, period=14, column="Close"):
+        self.column = column
+        self._up = RollingSum(period)
+        self._down = RollingSum(period)
+        self._prev = NAN
+
+    def update(self, bar):
+        close = float(bar[self.column])
+        delta = close - self._prev
+        self._prev = close
+        self._up.update(max(delta, 0.0) if not math.isnan(delta) else NAN)
+        self._down.update(-min(delta, 0.0) if not math.isnan(delta) else NAN)
+        rs = self._up.mean / (self._down.mean + 1e-8)
+        self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD em streaming; value = (linha MACD, linha de sinal), como ta.macd."""
+    def __init__(self, fast=12, slow=26, signal=9, column="Close"):
+        self.column = column
+        self._fast = StreamingEMA(fast)
+        self._slow = StreamingEMA(slow)
+        self._signal = StreamingEMA(signal)
+        self.value = (NAN, NAN)
+
+    def update(self, bar):
+        close = bar[self.column]
+        line = self._fast.push(close) - self._slow.push(close)
+        self.value = (line, self._signal.push(line))
+        return self.value
+
+
+class StreamingBollinger(StreamingIndicator):
+    """Bandas de Bollinger em streaming; value = (média, superior, inferior), como ta.bollinger_bands."""
+    def __init__(self, window=20, num_std=2, column="Close"):
+        self.column = column
+        self.num_std = num_std
+        self._sum = RollingSum(window)
+        self._var = RollingVariance(window)
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, bar):
+        close = bar[self.column]
+        self._sum.update(close)
+        std = math.sqrt(self._var.update(close))
+        mean = self._sum.mean
+        self.value = (mean, mean + self.num_std * std, mean - self.num_std * std)
+        return self.value
+
+
+class StreamingATR(StreamingIndicator):
+    """ATR em streaming (média simples do True Range, como ta.atr)."""
+    def __init__(self, period=14):
+        self._tr = RollingSum(period)
+        self._prev_close = NAN
+
+    def update(self, bar):
+        high, low, close = float(bar["High"]), float(bar["Low"]), float(bar["Close"])
+        ranges = [high - low, abs(high - self._prev_close), abs(low - self._prev_close)]
+        ranges = [r for r in ranges if not math.isnan(r)]
+        self._prev_close = close
+        self._tr.update(max(ranges) if ranges else NAN)
+        self.value = self._tr.mean
+        return self.value
+
+
+class StreamingADX(StreamingIndicator):
+    """ADX em streaming (mesmas fórmulas de ta.adx)."""
+    def __init__(self, period=14):
+        self._atr = StreamingATR(period)
+        self._plus_dm = RollingSum(period)
+        self._minus_dm = RollingSum(period)
+        self._dx = RollingSum(period)
+        self._prev_high = NAN
+        self._prev_low = NAN
+
+    def update(self, bar):
+        high, low = float(bar["High"]), float(bar["Low"])
+        plus_dm = high - self._prev_high
+        minus_dm = abs(low - self._prev_low)
+        self._prev_high, self._prev_low = high, low
+        atr_ = self._atr.update(bar)
+        self._plus_dm.update(max(plus_dm, 0.0) if not math.isnan(plus_dm) else NAN)
+        self._minus_dm.update(minus_dm)
+        plus_di = 100 * (self._plus_dm.sum / atr_)
+        minus_di = 100 * (self._minus_dm.sum / atr_)
+        self._dx.update((abs(plus_di - minus_di) / (plus_di + minus_di + 1e-8)) * 100)
+        self.value = self._dx.mean
+        return self.value
+
+
+class StreamingStochastic(StreamingIndicator):
+    """Estocástico %K em streaming (como ta.stochastic_k)."""
+    def __init__(self, k_period=14):
+        self._lowest = RollingExtremum(k_period, "min")
+        self._highest = RollingExtremum(k_period, "max")
+
+    def update(self, bar):
+        lowest_low = self._lowest.update(bar["Low"])
+        highest_high = self._highest.update(bar["High"])
+        self.value = 100 * ((float(bar["Close"]) - lowest_low) / (highest_high - lowest_low + 1e-8))
+        return self.value
+
+
+class StreamingOBV(StreamingIndicator):
+    """On Balance Volume em streaming (como ta.obv: NaN nas barras sem volume, sem parar a soma)."""
+    def __init__(self):
+        self._prev_close = NAN
+        self._total = 0.0
+
+    def update(self, bar):
+        close = float(bar["Close"])
+        direction = np.sign(close - self._prev_close)
+        self._prev_close = close
+        flow = (0.0 if math.isnan(direction) else direction) * float(bar["Volume"])
+        if math.isnan(flow):
+            self.value = NAN
+        else:
+            self._total += flow
+            self.value = self._total
+        return self.value
+
+
+class StreamingMFI(StreamingIndicator):
+    """Money Flow Index em streaming (como ta.mfi: janela completa de `period` barras)."""
+    def __init__(self, period=14):
+        self._pos = RollingSum(period, min_periods=period)
+        self._neg = RollingSum(period, min_periods=period)
+        self._prev_tp = NAN
+
+    def update(self, bar):
+        tp = (float(bar["High"]) + float(bar["Low"]) + float(bar["Close"])) / 3
+        money_flow = tp * float(bar["Volume"])
+        self._pos.update(money_flow if tp > self._prev_tp else 0.0)
+        self._neg.update(money_flow if tp < self._prev_tp else 0.0)
+        self._prev_tp = tp
+        self.value = 100 - (100 / (1 + (self._pos.sum / (self._neg.sum + 1e-8))))
+        return self.value
+
+
+class StreamingDonchian(StreamingIndicator):
+    """Canal de Donchian em streaming; value = (superior, meio, inferior), como ta.donchian_channels."""
+    def __init__(self, window=20):
+        self._highest = RollingExtremum(window, "max")
+        self._lowest = RollingExtremum(window, "min")
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, bar):
+        upper = self._highest.update(bar["High"])
+        lower = self._lowest.update(bar["Low"])
+        self.value = (upper, (upper + lower) / 2, lower)
+        return self.value
+
+
+class StreamingWilliamsR(StreamingIndicator):
+    """Williams %R em streaming (como ta.williams_r)."""
+    def __init__(self, period=14):
+        self._highest = RollingExtremum(period, "max")
+        self._lowest = RollingExtremum(period, "min")
+
+    def update(self, bar):
+        highest_high = self._highest.update(bar["High"])
+        lowest_low = self._lowest.update(bar["Low"])
+        self.value = -100 * ((highest_high - float(bar["Close"])) / (highest_high - lowest_low + 1e-8))
+        return self.value
+
+
+class StreamingChandelierExit(StreamingIndicator):
+    """Chandelier Exit em streaming; value = (saída de posição longa, saída de posição curta)."""
+    def __init__(self, period=22, atr_mult=3):
+        self.atr_mult = atr_mult
+        self._atr = StreamingATR(period)
+        self._highest = RollingExtremum(period, "max")
+        self._lowest = RollingExtremum(period, "min")
+        self.value = (NAN, NAN)
+
+    def update(self, bar):
+        atr_ = self._atr.update(bar)
+        highest_high = self._highest.update(bar["High"])
+        lowest_low = self._lowest.update(bar["Low"])
+        self.value = (highest_high - self.atr_mult * atr_, lowest_low + self.atr_mult * atr_)
+        return self.value
+
+
+def default_streams():
+    """Conjunto de indicadores em streaming com os nomes/parâmetros de compute_all_indicators."""
+    return {
+        "sma10": StreamingSMA(10), "sma20": StreamingSMA(20),
+        "sma50": StreamingSMA(50), "sma200": StreamingSMA(200),
+        "ema10": StreamingEMA(10), "ema20": StreamingEMA(20),
+        "ema50": StreamingEMA(50), "ema200": StreamingEMA(200),
+        "rsi14": StreamingRSI(14),
+        "macd": StreamingMACD(12, 26, 9),
+        "bollinger": StreamingBollinger(20, 2),
+        "adx": StreamingADX(14),
+        "atr": StreamingATR(14),
+        "stoch_k": StreamingStochastic(14),
+        "obv": StreamingOBV(),
+        "mfi": StreamingMFI(14),
+    }
+
+
+class IndicatorStream:
+    """
+    Conjunto de indicadores em streaming actualizados em conjunto.
+    Ex.: stream = IndicatorStream().seed(df); valores = stream.update(nova_barra)
+    Devolve {nome: valor} com as mesmas chaves de compute_all_indicators
+    (macd/macd_signal e bb_upper/bb_lower separados).
+    """
+    def __init__(self, indicators=None):
+        self.indicators = indicators if indicators is not None else default_streams()
+
+    def seed(self, data):
+        for bar in data.to_dict("records"):
+            self.update(bar)
+        return self
+
+    def update(self, bar):
+        for indicator in self.indicators.values():
+            indicator.update(bar)
+        return self.values()
+
+    def values(self):
+        out = {}
+        for name, indicator in self.indicators.items():
+            if isinstance(indicator, StreamingMACD):
+                out[name], out[f"{name}_signal"] = indicator.value
+            elif isinstance(indicator, StreamingBollinger):
+                _, out["bb_upper"], out["bb_lower"] = indicator.value
+            else:
+                out[name] = indicator.value
+        return out
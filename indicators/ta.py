@@ -1,5 +1,10 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from indicators.kernels import rolling_min, rolling_max
+
+# Elementos (janelas × tickers × barras da janela) de cada bloco de rolling_mad: limita os temporários
+MAD_CHUNK_ELEMENTS = 1 << 22
 
 # ----------------------------------- INDICADORES BÁSICOS -----------------------------------
 
@@ -7,13 +12,87 @@ def sma(series, window):
     """Média móvel simples (SMA)"""
     return series.rolling(window=window, min_periods=1).mean()
 
+def sma_many(series, windows):
+    """
+    SMA de várias janelas (como sma(), min_periods=1) a partir de uma única soma acumulada.
+    Devolve DataFrame datas × janelas. Os NaN são ignorados (soma e contagem só dos valores válidos).
+    """
+    values = np.asarray(series, dtype=float)
+    valid = ~np.isnan(values)
+    # Desvio em relação ao primeiro valor válido: somas acumuladas menores, menos erro de arredondamento
+    offset = values[valid][0] if valid.any() else 0.0
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values - offset, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    n = len(values)
+    ends = np.arange(1, n + 1)
+    result = np.empty((n, len(windows)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for j, window in enumerate(windows):
+            starts = np.maximum(ends - window, 0)
+            count = counts[ends] - counts[starts]
+            result[:, j] = np.where(count > 0, (sums[ends] - sums[starts]) / count + offset, np.nan)
+    return pd.DataFrame(result, index=series.index, columns=list(windows))
+
 def ema(series, window):
     """Média móvel exponencial (EMA)"""
     return series.ewm(span=window, adjust=False).mean()
 
+def rolling_std(series, window):
+    """Desvio-padrão móvel"""
+    return series.rolling(window=window, min_periods=1).std()
+
+def true_range(high, low, close):
+    """True Range (base do ATR e do ADX)"""
+    tr1 = high - low
+    tr2 = (high - close.shift()).abs()
+    tr3 = (low - close.shift()).abs()
+    # fmax ignora NaN (como max(axis=1)) e funciona também com DataFrames de vários tickers
+    return np.fmax(np.fmax(tr1, tr2), tr3)
+
+def typical_price(high, low, close):
+    """Preço típico (base do CCI e do MFI)"""
+    return (high + low + close) / 3
+
+def _window_mad(windows):
+    """Desvio absoluto médio de cada janela (último eixo); ignora NaN, como Series.mean."""
+    valid = ~np.isnan(windows)
+    if valid.all():
+        means = windows.mean(axis=-1)
+        return np.fabs(windows - means[..., None]).mean(axis=-1)
+    counts = valid.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(valid, windows, 0).sum(axis=-1) / counts
+        dev = np.where(valid, np.fabs(windows - means[..., None]), 0).sum(axis=-1) / counts
+    return np.where(counts > 0, dev, np.nan)
+
+def rolling_mad(series, window):
+    """
+    Desvio absoluto médio móvel (min_periods=1), vectorizado com uma vista de janelas
+    deslizantes; dá os mesmos valores que rolling(...).apply(lambda x: |x - média|.média()).
+    Aceita Series ou DataFrame (uma coluna por ticker); as janelas são processadas em blocos
+    de linhas (MAD_CHUNK_ELEMENTS), para que a memória temporária não cresça com o painel.
+    """
+    values = np.asarray(series, dtype=float)
+    matrix = values if values.ndim == 2 else values[:, None]
+    mad = np.empty(matrix.shape)
+    for i in range(min(window - 1, len(matrix))):
+        # Janelas incompletas do início
+        mad[i] = _window_mad(np.ascontiguousarray(matrix[:i + 1].T))
+    if len(matrix) >= window:
+        windows = sliding_window_view(matrix, window, axis=0)
+        step = max(1, MAD_CHUNK_ELEMENTS // (max(matrix.shape[1], 1) * window))
+        for start in range(0, len(windows), step):
+            mad[window - 1 + start:window - 1 + start + step] = _window_mad(windows[start:start + step])
+    if isinstance(series, pd.DataFrame):
+        return pd.DataFrame(mad, index=series.index, columns=series.columns)
+    return pd.Series(mad[:, 0], index=series.index, name=series.name)
+
 def rsi(series, period=14):
     """Índice de Força Relativa (RSI)"""
-    delta = series.diff()
+    return rsi_from_delta(series.diff(), period)
+
+def rsi_from_delta(delta, period=14):
+    """RSI a partir das variações já calculadas (series.diff())"""
     up = delta.clip(lower=0)
     down = -delta.clip(upper=0)
     ma_up = up.rolling(window=period, min_periods=1).mean()
@@ -23,8 +102,10 @@ def rsi(series, period=14):
 
 def macd(series, fast=12, slow=26, signal=9):
     """MACD + linha de sinal"""
-    fast_ema = ema(series, fast)
-    slow_ema = ema(series, slow)
+    return macd_from_emas(ema(series, fast), ema(series, slow), signal)
+
+def macd_from_emas(fast_ema, slow_ema, signal=9):
+    """MACD + linha de sinal a partir das EMAs rápida e lenta já calculadas"""
     macd_line = fast_ema - slow_ema
     signal_line = ema(macd_line, signal)
     return macd_line, signal_line
@@ -32,22 +113,25 @@ def macd(series, fast=12, slow=26, signal=9):
 def bollinger_bands(series, window=20, num_std=2):
     """Bandas de Bollinger"""
     sma_ = sma(series, window)
-    std = series.rolling(window=window, min_periods=1).std()
+    upper, lower = bands_from_std(sma_, rolling_std(series, window), num_std)
+    return sma_, upper, lower
+
+def bands_from_std(sma_, std, num_std=2):
+    """Bandas superior/inferior a partir da média e do desvio-padrão móveis"""
     upper = sma_ + num_std * std
     lower = sma_ - num_std * std
-    return sma_, upper, lower
+    return upper, lower
 
 def adx(high, low, close, period=14):
     """ADX: força da tendência"""
+    return adx_from_atr(high, low, atr(high, low, close, period), period)
+
+def adx_from_atr(high, low, atr_, period=14):
+    """ADX a partir do ATR já calculado"""
     plus_dm = high.diff()
     minus_dm = low.diff().abs()
     plus_dm[plus_dm < 0] = 0
     minus_dm[minus_dm < 0] = 0
-    tr1 = high - low
-    tr2 = (high - close.shift()).abs()
-    tr3 = (low - close.shift()).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr_ = tr.rolling(window=period, min_periods=1).mean()
     plus_di = 100 * (plus_dm.rolling(window=period, min_periods=1).sum() / atr_)
     minus_di = 100 * (minus_dm.rolling(window=period, min_periods=1).sum() / atr_)
     dx = (abs(plus_di - minus_di) / (plus_di + minus_di + 1e-8)) * 100
@@ -55,37 +139,71 @@ def adx(high, low, close, period=14):
 
 def cci(high, low, close, period=20):
     """Commodity Channel Index (CCI)"""
-    tp = (high + low + close) / 3
+    return cci_from_tp(typical_price(high, low, close), period)
+
+def cci_from_tp(tp, period=20):
+    """CCI a partir do preço típico já calculado"""
     sma_tp = tp.rolling(window=period, min_periods=1).mean()
-    mad = tp.rolling(window=period, min_periods=1).apply(lambda x: np.fabs(x - x.mean()).mean())
+    mad = rolling_mad(tp, period)
     cci = (tp - sma_tp) / (0.015 * mad)
     return cci
 
 def atr(high, low, close, period=14):
     """Average True Range (ATR)"""
-    tr1 = high - low
-    tr2 = (high - close.shift()).abs()
-    tr3 = (low - close.shift()).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(window=period, min_periods=1).mean()
+    return true_range(high, low, close).rolling(window=period, min_periods=1).mean()
 
 def stochastic_k(close, low, high, k_period=14):
     """Estocástico %K"""
-    lowest_low = low.rolling(window=k_period, min_periods=1).min()
-    highest_high = high.rolling(window=k_period, min_periods=1).max()
+    lowest_low = rolling_min(low, k_period)
+    highest_high = rolling_max(high, k_period)
     return 100 * ((close - lowest_low) / (highest_high - lowest_low + 1e-8))
 
+def williams_r(high, low, close, period=14):
+    """Williams %R (entre -100 e 0)"""
+    highest_high = rolling_max(high, period)
+    lowest_low = rolling_min(low, period)
+    return -100 * ((highest_high - close) / (highest_high - lowest_low + 1e-8))
+
+def donchian_channels(high, low, window=20):
+    """Canal de Donchian: máximo e mínimo de `window` barras e o ponto médio"""
+    upper = rolling_max(high, window)
+    lower = rolling_min(low, window)
+    return upper, (upper + lower) / 2, lower
+
+def chandelier_exit(high, low, close, atr_period=22, atr_mult=3):
+    """Chandelier Exit: stops de saída (longa, curta) a atr_mult ATRs do máximo/mínimo de atr_period barras"""
+    atr_ = atr(high, low, close, atr_period)
+    long_exit = rolling_max(high, atr_period) - atr_mult * atr_
+    short_exit = rolling_min(low, atr_period) + atr_mult * atr_
+    return long_exit, short_exit
+
 def obv(close, volume):
     """On Balance Volume (OBV)"""
-    direction = np.sign(close.diff()).fillna(0)
+    return obv_from_delta(close.diff(), volume)
+
+def obv_from_delta(delta, volume):
+    """OBV a partir das variações do fecho já calculadas"""
+    direction = np.sign(delta).fillna(0)
     return (direction * volume).cumsum()
 
 def mfi(close, high, low, volume, period=14):
     """Money Flow Index (MFI)"""
-    typical_price = (high + low + close) / 3
-    money_flow = typical_price * volume
-    pos_flow = money_flow.where(typical_price > typical_price.shift(), 0).rolling(period).sum()
-    neg_flow = money_flow.where(typical_price < typical_price.shift(), 0).rolling(period).sum()
+    return mfi_from_tp(typical_price(high, low, close), volume, period)
+
+def mfi_from_tp(tp, volume, period=14, skip=None):
+    """
+    MFI a partir do preço típico já calculado.
+    skip (opcional): máscara das linhas que ficam fora das somas, como se não existissem
+    (ex.: as datas anteriores à primeira barra de um ticker num painel).
+    """
+    money_flow = tp * volume
+    tp_prev = tp.shift()
+    pos_flow = money_flow.where(tp > tp_prev, 0)
+    neg_flow = money_flow.where(tp < tp_prev, 0)
+    if skip is not None:
+        pos_flow, neg_flow = pos_flow.mask(skip), neg_flow.mask(skip)
+    pos_flow = pos_flow.rolling(period).sum()
+    neg_flow = neg_flow.rolling(period).sum()
     mfi = 100 - (100 / (1 + (pos_flow / (neg_flow + 1e-8))))
     return mfi
 
@@ -105,44 +223,14 @@ def is_bearish_engulfing(open_, close):
 # -------------- EXEMPLO DE INTEGRAR INDICADORES FUTUROS/TODO --------------
 # def force_index(close, volume, n=13): ...
 
-# def chandelier_exit(high, low, close, atr_period=22, atr_mult=3): ...
-
 # ------------------- FEATURE SET COMPLETO PARA IA E BACKTEST --------------
 def compute_all_indicators(data):
     """
     Retorna um dicionário com todos os indicadores para Machine Learning ou análise.
     Requer DataFrame com: 'Open', 'High', 'Low', 'Close', 'Volume'
+    Os resultados intermédios comuns (EMA12/26, desvio-padrão de 20 períodos, True Range,
+    preço típico, variação do fecho) são calculados uma só vez (ver indicators/graph.py).
     """
-    close = data['Close']
-    high = data['High']
-    low = data['Low']
-    volume = data['Volume']
-    open_ = data['Open']
-    features = {
-        "sma10": sma(close, 10),
-        "sma20": sma(close, 20),
-        "sma50": sma(close, 50),
-        "sma200": sma(close, 200),
-        "ema10": ema(close, 10),
-        "ema20": ema(close, 20),
-        "ema50": ema(close, 50),
-        "ema200": ema(close, 200),
-        "rsi14": rsi(close, 14),
-        "macd": macd(close)[0],
-        "macd_signal": macd(close)[1],
-        "bb_upper": bollinger_bands(close)[1],
-        "bb_lower": bollinger_bands(close)[2],
-        "adx": adx(high, low, close, 14),
-        "cci": cci(high, low, close, 20),
-        "atr": atr(high, low, close, 14),
-        "stoch_k": stochastic_k(close, low, high, 14),
-        "obv": obv(close, volume),
-        "mfi": mfi(close, high, low, volume, 14),
-        "avg_vol20": average_volume(volume, 20),
-        "avg_vol50": average_volume(volume, 50),
-        "avg_vol200": average_volume(volume, 200),
-        "bullish_engulfing": is_bullish_engulfing(open_, close),
-        "bearish_engulfing": is_bearish_engulfing(open_, close),
-        # TODO: Integrar force_index, chandelier_exit, safezone_stop, padrões avançados...
-    }
-    return features
+    from indicators.graph import IndicatorGraph
+    # TODO: Integrar force_index, safezone_stop, padrões avançados...
+    return IndicatorGraph(data).compute()
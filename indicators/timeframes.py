@@ -0,0 +1,104 @@
+"""
+Features de vários horizontes temporais (semanal/mensal) alinhadas com as barras diárias.
+
+As barras diárias são agregadas por período (semana terminada à sexta, mês) e cada barra
+agregada fica datada com a última barra diária do período, ou seja, só "existe" a partir
+do fecho em que fica conhecida. O período em curso (incompleto) é ignorado. Os
+indicadores semanais/mensais são depois alinhados com o índice diário levando, para cada
+dia, o valor do último período já fechado nessa data: nenhum valor usa barras futuras.
+
+As agregações e o estado dos indicadores ficam em cache por (ticker, intervalo, horizonte)
+e são actualizados de forma incremental: quando chegam barras novas só se reagregam os
+períodos a partir da primeira barra nova ou revista.
+"""
+
+import pandas as pd
+
+from data.memory_cache import FrameLRUCache
+from indicators.graph import compute_features_incremental, common_prefix, SOURCE_COLUMNS
+
+# prefixo das colunas -> frequência de período pandas
+TIMEFRAMES = {"w": "W-FRI", "m": "M"}
+# Indicadores calculados em cada horizonte (nós do grafo de indicators/graph.py)
+MTF_FEATURES = ["sma10", "ema20", "rsi14", "macd", "macd_signal", "atr", "adx", "stoch_k"]
+DEFAULT_TIMEFRAME_CACHE_BYTES = 64 * 1024 ** 2
+
+AGGREGATIONS = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Adj Close": "last", "Volume": "sum"}
+
+
+def resample_ohlcv(data, freq):
+    """
+    Agrega barras OHLCV por período (freq de pandas.Period, ex. 'W-FRI', 'M').
+    Devolve só os períodos completos, indexados pela data da última barra de cada período.
+    """
+    if data is None or data.empty:
+        return data
+    periods = data.index.to_period(freq)
+    agg = {col: how for col, how in AGGREGATIONS.items() if col in data.columns}
+    bars = data.groupby(periods).agg(agg)
+    last_period = bars.index[-1]
+    bars.index = pd.DatetimeIndex(pd.Series(data.index, index=periods).groupby(level=0).last().to_numpy(),
+                                  name=data.index.name)
+    # O último período só conta se os dados já chegaram ao seu último dia útil
+    if data.index[-1] < pd.offsets.BDay().rollback(last_period.end_time.normalize()):
+        bars = bars.iloc[:-1]
+    return bars
+
+
+class TimeframeFeatures:
+    """
+    Calcula e mantém em cache as features semanais/mensais de cada série.
+    O estado guardado por (ticker, intervalo, horizonte) é (OHLCV diário, barras agregadas,
+    estado de compute_features_incremental).
+    """
+    def __init__(self, timeframes=None, names=None, max_bytes=DEFAULT_TIMEFRAME_CACHE_BYTES):
+        self.timeframes = timeframes or TIMEFRAMES
+        self.names = names or MTF_FEATURES
+        self.states = FrameLRUCache(max_bytes, label="Cache de horizontes temporais")
+
+    def _resample(self, data, freq, state):
+        """Barras agregadas de `data`, reaproveitando os períodos anteriores à primeira barra alterada."""
+        if state is None:
+            return resample_ohlcv(data, freq)
+        previous, bars, _ = state
+        prefix = common_prefix(previous, data)
+        if prefix == 0 or bars is None or bars.empty:
+            return resample_ohlcv(data, freq)
+        # Períodos fechados antes do período da primeira barra nova/alterada mantêm-se
+        first_changed = data.index[min(prefix, len(data) - 1)].to_period(freq)
+        start = data.index.searchsorted(first_changed.start_time)
+        kept = bars[bars.index < first_changed.start_time]
+        return pd.concat([kept, resample_ohlcv(data.iloc[start:], freq)])
+
+    def compute(self, data):
+        """DataFrame com as features de cada horizonte (ex.: 'w_rsi14', 'm_macd') no índice diário de `data`."""
+        attrs = getattr(data, "attrs", {}) or {}
+        ticker, interval = attrs.get("ticker"), attrs.get("interval")
+        columns = {}
+        for prefix, freq in self.timeframes.items():
+            key = (ticker, interval, freq)
+            state = self.states.get(key) if ticker else None
+            bars = self._resample(data, freq, state)
+            if bars is None or bars.empty:
+                for name in self.names:
+                    columns[f"{prefix}_{name}"] = pd.Series(float("nan"), index=data.index)
+                continue
+            features, feature_state = compute_features_incremental(
+                bars, state[2] if state is not None else None, names=self.names)
+            if ticker:
+                ohlcv = data[[c for c in SOURCE_COLUMNS.values() if c in data.columns]].copy()
+                self.states[key] = (ohlcv, bars, feature_state)
+            # Cada dia recebe o valor do último período fechado até essa data (sem lookahead)
+            aligned = features.reindex(data.index, method="ffill")
+            for name in self.names:
+                columns[f"{prefix}_{name}"] = aligned[name]
+        return pd.DataFrame(columns, index=data.index)
+
+
+# Instância partilhada (usada por IndicatorCache.features com multi_timeframe=True)
+timeframe_features = TimeframeFeatures()
+
+
+def multi_timeframe_features(data):
+    """Features semanais e mensais de `data`, alinhadas com o índice diário."""
+    return timeframe_features.compute(data)
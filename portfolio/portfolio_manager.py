@@ -64,12 +64,13 @@ class PortfolioManager:
         total_cost = 0
         total_profit = 0
         positions_metrics = []
+        prices = data_provider.get_current_prices([pos['ticker'] for pos in self.positions])
         for pos in self.positions:
             ticker = pos['ticker']
             quantity = pos['quantity']
             buy_price = pos['buy_price']
             buy_date = pos.get('buy_date')
-            current_price = data_provider.get_current_price(ticker)
+            current_price = prices.get(ticker.upper())
             value = quantity * current_price if current_price else 0
             profit = (current_price - buy_price) * quantity if current_price else 0
             total_value += value
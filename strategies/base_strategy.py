@@ -1,3 +1,7 @@
+import inspect
+import pandas as pd
+
+
 class BaseStrategy:
     """
     Classe base para todas as estratégias.
@@ -9,3 +13,17 @@ class BaseStrategy:
     def generate_signals(self, data):
         raise NotImplementedError("Subclasses devem implementar generate_signals()")
 
+    def get_params(self):
+        """Parâmetros do construtor (nome -> valor actual), que identificam a configuração da estratégia."""
+        names = [name for name in inspect.signature(type(self).__init__).parameters if name != "self"]
+        return {name: getattr(self, name) for name in names if hasattr(self, name)}
+
+    @classmethod
+    def grid_signals(cls, data, points):
+        """
+        Sinais de vários conjuntos de parâmetros (lista de dicts com os argumentos do construtor).
+        Devolve DataFrame datas × len(points), coluna i = sinais de cls(**points[i]).
+        As subclasses podem reimplementar para partilhar cálculos entre os pontos da grelha.
+        """
+        return pd.DataFrame({i: cls(**params).generate_signals(data) for i, params in enumerate(points)},
+                            index=data.index, columns=range(len(points)))
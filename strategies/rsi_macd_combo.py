@@ -1,6 +1,7 @@
 import pandas as pd
 from strategies.base_strategy import BaseStrategy
 from indicators.ta import rsi, macd
+from indicators.cache import cached_indicator
 
 class RSIMACDStrategy(BaseStrategy):
     """
@@ -20,8 +21,8 @@ class RSIMACDStrategy(BaseStrategy):
             raise KeyError("O DataFrame precisa de uma coluna 'Close'.")
 
         close = data['Close']
-        rsi_series = rsi(close, period=14)
-        macd_line, signal_line = macd(close)
+        rsi_series = cached_indicator(data, "rsi", lambda: rsi(close, period=14), (14,))
+        macd_line, signal_line = cached_indicator(data, "macd", lambda: macd(close), (12, 26, 9))
         signals = pd.Series(0, index=data.index)
 
         # Compra: RSI cruza limiar de baixo para cima e MACD positivo
@@ -1,7 +1,12 @@
+import numpy as np
 import pandas as pd
 from indicators import ta
+from indicators.cache import cached_indicator
 from strategies.base_strategy import BaseStrategy
 
+# Diferenças relativas abaixo disto entre as SMA do sweep contam como empate (erro de arredondamento)
+SWEEP_TIE_RTOL = 1e-10
+
 class SMACrossoverStrategy(BaseStrategy):
     """
     Estratégia de cruzamento de médias móveis simples (SMA).
@@ -19,8 +24,48 @@ class SMACrossoverStrategy(BaseStrategy):
             raise KeyError("O DataFrame precisa de uma coluna 'Close'.")
 
         close = data['Close']
-        short_sma = ta.sma(close, self.short_window)
-        long_sma = ta.sma(close, self.long_window)
+        short_sma = cached_indicator(data, "sma", lambda: ta.sma(close, self.short_window), (self.short_window,))
+        long_sma = cached_indicator(data, "sma", lambda: ta.sma(close, self.long_window), (self.long_window,))
         position = (short_sma > long_sma).astype(int)
         signals = position.diff().fillna(0).astype(int)
         return signals.reindex(close.index, fill_value=0)
+
+    @classmethod
+    def sweep_signals(cls, data, short_windows, long_windows):
+        """
+        Sinais de toda a grelha (short, long) de uma só vez, para optimização de parâmetros.
+        As SMA de todas as janelas saem de uma única soma acumulada de 'Close' (ta.sma_many)
+        e são partilhadas entre os pares. Só entram os pares com short < long.
+        Devolve DataFrame datas × MultiIndex (short_window, long_window) com os mesmos
+        sinais que generate_signals daria para cada par.
+        """
+        pairs = [(sw, lw) for sw in short_windows for lw in long_windows if sw < lw]
+        columns = pd.MultiIndex.from_tuples(pairs, names=["short_window", "long_window"])
+        return pd.DataFrame(cls._pair_signals(data, pairs), index=data.index, columns=columns)
+
+    @classmethod
+    def grid_signals(cls, data, points):
+        """Como BaseStrategy.grid_signals, mas com as SMA partilhadas entre os pontos (ver sweep_signals)."""
+        pairs = [(params.get("short_window", 50), params.get("long_window", 200)) for params in points]
+        return pd.DataFrame(cls._pair_signals(data, pairs), index=data.index, columns=range(len(points)))
+
+    @staticmethod
+    def _pair_signals(data, pairs):
+        """Matriz datas × pares de sinais de cruzamento, a partir de uma única soma acumulada de 'Close'."""
+        if data is None or data.empty:
+            raise ValueError("Dados históricos vazios ou inválidos.")
+        if 'Close' not in data.columns:
+            raise KeyError("O DataFrame precisa de uma coluna 'Close'.")
+        if not pairs:
+            return np.zeros((len(data), 0), dtype=int)
+        windows = sorted({w for pair in pairs for w in pair})
+        smas = cached_indicator(data, "sma_many", lambda: ta.sma_many(data['Close'], windows), tuple(windows))
+        smas = smas.to_numpy()
+        position = {w: j for j, w in enumerate(windows)}
+        short_sma = smas[:, [position[sw] for sw, _ in pairs]]
+        long_sma = smas[:, [position[lw] for _, lw in pairs]]
+        with np.errstate(invalid="ignore"):
+            above = (short_sma - long_sma) > SWEEP_TIE_RTOL * np.abs(long_sma)
+        signals = np.zeros(above.shape, dtype=int)
+        signals[1:] = np.diff(above.astype(int), axis=0)
+        return signals
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+
+from data.sources import DataSource  # noqa: E402
+from data.data_provider import DataProvider  # noqa: E402
+from data.negative_cache import is_missing_symbol_error  # noqa: E402
+
+
+class FakeSource(DataSource):
+    """Fonte em memória: fechos diários, com um split opcional aplicado a todo o histórico."""
+    def __init__(self, now):
+        self.current = pd.Timestamp(now)
+        self.missing = set()
+        self.split_date = None
+        self.split_ratio = 1.0
+        self.requests = []
+        self.batches = []
+
+    def now(self):
+        return self.current
+
+    def history(self, ticker, interval, start=None, end=None, period=None):
+        self.requests.append(start)
+        if ticker in self.missing:
+            return None
+        days = pd.bdate_range("2024-01-01", self.current.normalize())
+        close = pd.Series(100.0 + np.arange(len(days)) * 0.1, index=days)
+        if self.split_date is not None and self.current >= self.split_date:
+            # Depois do split o preço negociado cai e o Yahoo reajusta todas as barras anteriores:
+            # a série ajustada fica toda na nova escala
+            close /= self.split_ratio
+        data = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000.0})
+        data.index.name = "Date"
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        return data
+
+    def history_many(self, tickers, interval, start=None, end=None, period=None):
+        self.batches.append(list(tickers))
+        return super().history_many(tickers, interval, start=start, end=end, period=period)
+
+    def last_prices(self, tickers):
+        return {}
+
+
+def make_provider(source, tmp_path):
+    return DataProvider(source=source, store_dir=str(tmp_path / "store"),
+                        negative_cache_file=str(tmp_path / "negative.csv"))
+
+
+def test_top_up_reloads_history_adjusted_after_split(tmp_path):
+    source = FakeSource("2024-10-14 18:00")
+    first = make_provider(source, tmp_path).get_historical_data("AAA")
+    assert first["Close"].iloc[-1] > 100
+
+    source.current = pd.Timestamp("2024-10-17 18:00")
+    source.split_date, source.split_ratio = pd.Timestamp("2024-10-16"), 2.0
+    data = make_provider(source, tmp_path).get_historical_data("AAA")
+
+    expected = source.history("AAA", "1d")
+    pd.testing.assert_series_equal(data["Close"], expected["Close"].loc[data.index[0]:], check_freq=False)
+    # Sem salto falso de -50% no ponto de junção
+    assert data["Close"].pct_change().min() > -0.01
+    # O armazém fica com a série reajustada
+    stored = make_provider(source, tmp_path).store.load("AAA", "1d")
+    assert stored["Close"].pct_change().min() > -0.01
+
+
+def test_top_up_without_adjustment_only_requests_the_tail(tmp_path):
+    source = FakeSource("2024-10-14 18:00")
+    make_provider(source, tmp_path).get_historical_data("AAA")
+    source.current = pd.Timestamp("2024-10-17 18:00")
+    source.requests.clear()
+    data = make_provider(source, tmp_path).get_historical_data("AAA")
+    assert source.requests == [pd.Timestamp("2024-10-11")]
+    assert data.index[-1] == pd.Timestamp("2024-10-17")
+
+
+def test_many_downloads_in_batches(tmp_path):
+    source = FakeSource("2024-10-14 18:00")
+    tickers = [f"T{i:03d}" for i in range(120)]
+    result = make_provider(source, tmp_path).get_historical_data_many(tickers, batch_size=50)
+    assert sorted(len(batch) for batch in source.batches) == [20, 50, 50]
+    assert all(result[ticker] is not None for ticker in tickers)
+
+
+def test_sliding_window_registers_the_full_stored_series(tmp_path):
+    from indicators.cache import indicator_cache
+    source = FakeSource("2025-06-17 18:00")
+    first = make_provider(source, tmp_path).get_historical_data("AAA")
+    source.current = pd.Timestamp("2025-06-18 18:00")
+    data = make_provider(source, tmp_path).get_historical_data("AAA")
+    # A janela de um ano deslizou, mas a série registada para as features mantém o início do armazém
+    assert data.index[0] > first.index[0]
+    stored = make_provider(source, tmp_path).store.load("AAA", "1d")
+    history = indicator_cache.histories.get(("AAA", "1d"))
+    pd.testing.assert_index_equal(history.index, stored.index)
+    assert history.index[-1] == data.index[-1]
+
+
+def test_missing_symbol_errors_match_only_yfinance_messages():
+    assert is_missing_symbol_error(RuntimeError("$XYZ: possibly delisted; no timezone found"))
+    assert is_missing_symbol_error("YFPricesMissingError('$XYZ: possibly delisted; no price data found')")
+    assert not is_missing_symbol_error(RuntimeError("HTTP Error 404: Not Found"))
+    assert not is_missing_symbol_error(RuntimeError("Max retries exceeded: endpoint not found"))
+
+
+def test_empty_result_marks_ticker_only_for_period_requests(tmp_path):
+    source = FakeSource("2024-10-14 18:00")
+    source.missing.add("AAA")
+    window = DataProvider(source=source, store_dir=str(tmp_path / "store"), start_date="2024-03-01",
+                          end_date="2024-04-01", negative_cache_file=str(tmp_path / "negative.csv"))
+    assert window.get_historical_data("AAA") is None
+    assert window.get_historical_data_many(["AAA"]) == {"AAA": None}
+    assert not window.negative_cache.is_bad("AAA")
+
+    provider = make_provider(source, tmp_path)
+    assert provider.get_historical_data("AAA") is None
+    assert provider.negative_cache.is_bad("AAA")
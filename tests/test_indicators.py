@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators.ta import compute_all_indicators
+from indicators.panel import compute_panel_indicators, panel_ticker_features
+
+
+def make_ohlcv(index, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(index)
+    close = 100 + rng.standard_normal(n).cumsum()
+    open_ = close + rng.standard_normal(n)
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + rng.random(n),
+        "Low": np.minimum(open_, close) - rng.random(n),
+        "Close": close,
+        "Volume": rng.integers(100_000, 1_000_000, n).astype(float),
+    }, index=index)
+
+
+def reference_mfi(data, period=14):
+    """MFI original (antes do grafo de indicadores), para comparação."""
+    tp = (data["High"] + data["Low"] + data["Close"]) / 3
+    money_flow = tp * data["Volume"]
+    tp_prev = tp.shift()
+    pos_flow = money_flow.where(tp > tp_prev, 0).rolling(period).sum()
+    neg_flow = money_flow.where(tp < tp_prev, 0).rolling(period).sum()
+    return 100 - (100 / (1 + (pos_flow / (neg_flow + 1e-8))))
+
+
+def test_mfi_with_nan_bar_matches_original():
+    data = make_ohlcv(pd.bdate_range("2020-01-01", periods=200))
+    data.iloc[50] = np.nan
+    mfi = compute_all_indicators(data)["mfi"]
+    pd.testing.assert_series_equal(mfi, reference_mfi(data), check_names=False)
+    assert mfi.iloc[50:64].notna().all()
+
+
+def test_panel_matches_single_ticker_with_nan_rows():
+    index = pd.bdate_range("2020-01-01", periods=300)
+    frames = {
+        "AAA": make_ohlcv(index, 1),
+        # Falhas a meio do calendário e uma barra com NaN em tudo menos o Open
+        "BBB": make_ohlcv(index.delete([40, 41, 120, 200, 201]), 2),
+        # Começa mais tarde e tem um fecho em falta
+        "CCC": make_ohlcv(index[60:], 3),
+    }
+    frames["BBB"].iloc[100, 1:] = np.nan
+    frames["CCC"].iloc[30, frames["CCC"].columns.get_loc("Close")] = np.nan
+    result = compute_panel_indicators(frames)
+    for ticker, data in frames.items():
+        expected = pd.DataFrame(compute_all_indicators(data))
+        got = panel_ticker_features(result, ticker).loc[data.index, expected.columns]
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False, check_freq=False,
+                                      check_names=False, rtol=1e-9)
+
+
+def test_streaming_matches_batch_with_nan_bars():
+    from indicators.streaming import IndicatorStream
+    data = make_ohlcv(pd.bdate_range("2020-01-01", periods=300), 4)
+    data.iloc[150, data.columns.get_loc("Close")] = np.nan
+    data.iloc[180] = np.nan
+    data.iloc[200, data.columns.get_loc("Volume")] = np.nan
+    expected = pd.DataFrame(compute_all_indicators(data)).iloc[100:]
+    stream = IndicatorStream().seed(data.iloc[:100])
+    got = pd.DataFrame([stream.update(bar) for bar in data.iloc[100:].to_dict("records")], index=data.index[100:])
+    pd.testing.assert_frame_equal(got[expected.columns.intersection(got.columns)],
+                                  expected[expected.columns.intersection(got.columns)],
+                                  check_freq=False, rtol=1e-9)
+
+
+def test_features_of_a_sliding_window_reuse_the_full_series(monkeypatch):
+    from indicators import graph
+    from indicators.cache import IndicatorCache
+    history = make_ohlcv(pd.bdate_range("2020-01-01", periods=320), 5)
+    history.attrs.update(ticker="AAA", interval="1d")
+    # Janela de 250 barras: cada barra nova tira a primeira, como o period='1y' do DataProvider
+    ends = (300, 301, 302)
+    expected = {end: pd.DataFrame(compute_all_indicators(history.iloc[:end])).iloc[end - 250:].dropna()
+                for end in ends}
+    lengths = []
+
+    class RecordingGraph(graph.IndicatorGraph):
+        def __init__(self, data, *args, **kwargs):
+            lengths.append(len(data))
+            super().__init__(data, *args, **kwargs)
+    monkeypatch.setattr(graph, "IndicatorGraph", RecordingGraph)
+
+    cache = IndicatorCache()
+    for end in ends:
+        full = history.iloc[:end]
+        window = full.iloc[end - 250:]
+        cache.register_history(full)
+        got = cache.features(window)
+        assert got.index[0] == window.index[0]
+        pd.testing.assert_frame_equal(got, expected[end][got.columns], check_freq=False, rtol=1e-9)
+    # Só o primeiro cálculo percorre a série inteira; os seguintes recalculam a cauda
+    assert lengths[0] == 300
+    assert len(lengths) == 3 and max(lengths[1:]) < 250
+
+
+def test_pattern_on_a_single_frame_is_labelled_with_its_ticker():
+    from indicators.patterns import detect_patterns, tickers_with_pattern
+    data = make_ohlcv(pd.bdate_range("2020-01-01", periods=200), 6)
+    counts = {name: hits.sum() for name, hits in detect_patterns(data).items()}
+    pattern = max(counts, key=counts.get)
+    data.attrs["ticker"] = "AAA"
+    assert list(tickers_with_pattern(data, pattern, last_n=200).index) == ["AAA"]
+    assert list(tickers_with_pattern(data, pattern, last_n=200, ticker="BBB").index) == ["BBB"]
+    data.attrs.clear()
+    with pytest.raises(ValueError):
+        tickers_with_pattern(data, pattern)
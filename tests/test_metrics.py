@@ -0,0 +1,15 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from backtest.metrics import calculate_batch_metrics
+
+
+def test_batch_metrics_without_enough_returns_give_nan_without_warnings():
+    equity = pd.DataFrame({"a": [100.0, 101.0, 102.0], "b": [100.0, np.nan, np.nan], "c": np.nan})
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        metrics = calculate_batch_metrics(np.zeros(equity.shape), equity)
+    assert np.isfinite(metrics.loc["a", "sharpe"])
+    assert metrics.loc[["b", "c"], "sharpe"].isna().all()